@@ -0,0 +1,57 @@
+import os
+import time
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+# Directory path -> (mtime_ns, listing). A directory's mtime changes when entries are added, removed
+# or renamed, so an unchanged mtime means the cached listing is still valid
+_listings = {}
+# Listings younger than this are not cached: coarse mtimes (1 s on some NFS servers) could hide
+# files added within the same tick
+MIN_CACHE_AGE = 2.0  # s
+
+def scan_dir(path):
+    """Returns ({lower case extension: [file names]}, [subfolder names]) of the directory without hidden
+    entries, from cache if the directory didn't change"""
+    mtime_ns = os.stat(path).st_mtime_ns
+    cached = _listings.get(path)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+
+    files = {}
+    folders = []
+    # scandir gets entry types from the directory listing itself, without a stat call per file
+    with os.scandir(path) as it:
+        for entry in it:
+            name = entry.name
+            if name.startswith('.'):
+                continue
+            if entry.is_dir():
+                folders.append(name)
+            else:
+                files.setdefault(os.path.splitext(name)[1].lower(), []).append(name)
+    listing = (files, folders)
+    if time.time() - mtime_ns / 1e9 >= MIN_CACHE_AGE:
+        _listings[path] = (mtime_ns, listing)
+    return listing
+
+def find_files(folder, extensions, recursive=False, exclude=()):
+    """Sorted paths of files in the folder whose extension (case-insensitive, e.g. '.jpg') is in extensions.
+    Hidden entries are skipped, like glob does. With recursive, subfolders are searched too, except the folders in exclude"""
+    extensions = {ext.lower() for ext in extensions}
+    # Absolute on both sides, so a relative output folder still matches inside an absolute input folder
+    excluded = {os.path.abspath(path) for path in exclude}
+    found = []
+    pending = [folder]
+    while pending:
+        current = pending.pop()
+        files, folders = scan_dir(current)
+        for ext in extensions:
+            found.extend(os.path.join(current, name) for name in files.get(ext, ()))
+        if recursive:
+            for name in folders:
+                path = os.path.join(current, name)
+                if os.path.abspath(path) not in excluded:
+                    pending.append(path)
+    found.sort()
+    return found
@@ -0,0 +1,13 @@
+import cv2
+import numpy as np
+
+def simplify_polygon(points, tolerance):
+    """Douglas-Peucker simplification (cv2.approxPolyDP) of a closed polygon given as an (N, 2) array in pixels.
+    Keeps vertices deviating more than tolerance from the simplified outline. Polygons of 3 or fewer vertices
+    come back unchanged, as do polygons that would collapse to fewer than 3"""
+    if len(points) <= 3 or tolerance <= 0:
+        return points
+    simplified = cv2.approxPolyDP(np.asarray(points, dtype=np.float32).reshape(-1, 1, 2), tolerance, True)
+    if len(simplified) < 3:
+        return points
+    return simplified.reshape(-1, 2).astype(points.dtype, copy=False)
@@ -0,0 +1,226 @@
+import os
+import csv
+import json
+import time
+import atexit
+import functools
+import threading
+import multiprocessing
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Setting this variable enables profiling and prints the summary at exit; a value ending in .json or .csv
+# also names the summary file. It is only read, worker processes are enabled through init_worker
+PROFILE_ENV = 'MARKUP_PROFILE'
+SUMMARY_SUFFIXES = ('.json', '.csv')
+# Upper bounds of the latency histogram buckets in ms, the last bucket holds everything slower
+BUCKET_BOUNDS = [0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+class Profiler:
+    """Per-stage latency histograms and counters, e.g. of files and bytes read. Does nothing until enabled,
+    then costs two perf_counter calls and a lock per measured stage. Safe to use from several threads"""
+    def __init__(self):
+        self.enabled = False
+        self.reporting = False
+        self.output = None
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.start_time = time.perf_counter()
+        self.stages = {}  # name -> [count, total ms, max ms, [count per bucket]]
+        self.counters = {}
+
+    def enable(self, output=None, report=True):
+        """Starts recording. With report the summary is printed at exit and, with output (a .json or .csv path),
+        written there. Process pools pass init_worker as initializer, so their workers record too and send
+        their data back with collect()"""
+        if not self.enabled:
+            self.enabled = True
+            self.reset()
+        if report and not self.reporting:
+            self.reporting = True
+            atexit.register(self._report_at_exit)
+        self.output = output or self.output
+
+    @contextmanager
+    def stage(self, name):
+        """Measures the latency of the code in the with block as one sample of the stage"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timed(self, name):
+        """Decorator measuring every call of the function as one sample of the stage"""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - start)
+            return wrapper
+        return decorate
+
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        ms = seconds * 1000
+        with self.lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = [0, 0.0, 0.0, [0] * (len(BUCKET_BOUNDS) + 1)]
+            stats[0] += 1
+            stats[1] += ms
+            stats[2] = max(stats[2], ms)
+            stats[3][bisect_left(BUCKET_BOUNDS, ms)] += 1
+
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def count_file(self, path):
+        """Counts one file read in 'files' and its size in 'bytes_read'"""
+        if not self.enabled:
+            return
+        try:
+            size = os.path.getsize(path)
+        except (OSError, TypeError):
+            return
+        self.count('files')
+        self.count('bytes_read', size)
+
+    def collect(self):
+        """Returns what was recorded since the last call and clears it, None when disabled.
+        Worker processes return this with their results for the parent to merge()"""
+        if not self.enabled:
+            return None
+        with self.lock:
+            data = (self.stages, self.counters)
+            self.stages = {}
+            self.counters = {}
+        return data
+
+    def merge(self, data):
+        """Adds data returned by collect() in another process"""
+        if not data or not self.enabled:
+            return
+        stages, counters = data
+        with self.lock:
+            for name, (count, total, peak, buckets) in stages.items():
+                stats = self.stages.get(name)
+                if stats is None:
+                    self.stages[name] = [count, total, peak, list(buckets)]
+                    continue
+                stats[0] += count
+                stats[1] += total
+                stats[2] = max(stats[2], peak)
+                stats[3] = [a + b for a, b in zip(stats[3], buckets)]
+            for name, value in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    @staticmethod
+    def _percentile(buckets, count, peak, fraction):
+        """Latency below which the given fraction of samples lies, interpolated within its histogram bucket"""
+        wanted = fraction * count
+        seen = 0
+        lower = 0.0
+        for upper, bucket_count in zip(BUCKET_BOUNDS + [peak], buckets):
+            if bucket_count and seen + bucket_count >= wanted:
+                upper = min(upper, peak)
+                return lower + (upper - lower) * (wanted - seen) / bucket_count
+            seen += bucket_count
+            lower = upper
+        return peak
+
+    def summary(self):
+        """{'elapsed_s', 'stages': {name: latency stats in ms}, 'counters': {name: {'total', 'per_s'}}}"""
+        elapsed = time.perf_counter() - self.start_time
+        with self.lock:
+            stages = {name: (stats[0], stats[1], stats[2], list(stats[3])) for name, stats in self.stages.items()}
+            counters = dict(self.counters)
+
+        labels = [f"<={bound}" for bound in BUCKET_BOUNDS] + [f">{BUCKET_BOUNDS[-1]}"]
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'stages': {name: {
+                'count': count,
+                'total_ms': round(total, 3),
+                'mean_ms': round(total / count, 3),
+                'p50_ms': round(self._percentile(buckets, count, peak, 0.5), 3),
+                'p95_ms': round(self._percentile(buckets, count, peak, 0.95), 3),
+                'max_ms': round(peak, 3),
+                'histogram_ms': {label: n for label, n in zip(labels, buckets) if n},
+            } for name, (count, total, peak, buckets) in sorted(stages.items())},
+            'counters': {name: {'total': value, 'per_s': round(value / elapsed, 3) if elapsed else 0.0}
+                         for name, value in sorted(counters.items())},
+        }
+
+    def format_summary(self):
+        """Short text table of the summary, for printing or an on-screen overlay"""
+        summary = self.summary()
+        lines = [f"{'stage':<12} {'n':>6} {'mean':>8} {'p95':>8} {'max':>8} ms"]
+        for name, stats in summary['stages'].items():
+            lines.append(f"{name:<12} {stats['count']:>6} {stats['mean_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['max_ms']:>8.2f}")
+        for name, stats in summary['counters'].items():
+            lines.append(f"{name:<12} {stats['total']:>15} {stats['per_s']:>11.1f}/s")
+        return "\n".join(lines)
+
+    def write(self, path):
+        """Writes the summary as JSON, or as CSV with one row per stage and counter if path ends in .csv"""
+        summary = self.summary()
+        if path.lower().endswith('.csv'):
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['kind', 'name', 'count', 'total', 'mean_ms', 'p50_ms', 'p95_ms', 'max_ms', 'per_s'])
+                for name, stats in summary['stages'].items():
+                    writer.writerow(['stage', name, stats['count'], stats['total_ms'], stats['mean_ms'],
+                                     stats['p50_ms'], stats['p95_ms'], stats['max_ms'], ''])
+                for name, stats in summary['counters'].items():
+                    writer.writerow(['counter', name, '', stats['total'], '', '', '', '', stats['per_s']])
+        else:
+            with open(path, 'w') as f:
+                json.dump(summary, f, indent=2)
+
+    def _after_fork(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def _report_at_exit(self):
+        if not (self.stages or self.counters or self.output):
+            return
+        print(self.format_summary())
+        if self.output:
+            self.write(self.output)
+            print(f"Profile written to {self.output}")
+
+profiler = Profiler()
+
+def init_worker(enabled):
+    """Process pool initializer: records in the worker if the parent does, e.g. with
+    ProcessPoolExecutor(initializer=init_worker, initargs=(profiler.enabled,)). Only the parent reports"""
+    if enabled:
+        profiler.enable(report=False)
+
+def _enable_from_env():
+    # Spawned workers import this module again; they are enabled by init_worker and don't report
+    if multiprocessing.current_process().name != 'MainProcess':
+        return
+    value = os.environ.get(PROFILE_ENV)
+    if value:
+        profiler.enable(value if value.lower().endswith(SUMMARY_SUFFIXES) else None)
+
+_enable_from_env()
+if hasattr(os, 'register_at_fork'):
+    # Forked workers start empty instead of sending the parent's data back again
+    os.register_at_fork(after_in_child=profiler._after_fork)
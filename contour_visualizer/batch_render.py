@@ -0,0 +1,210 @@
+import os
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from image_processor import ImageProcessor
+from markup_parser import MarkupParser
+from frame_index import FrameIndex, get_frame_number
+from common.file_discovery import find_files, IMAGE_EXTENSIONS
+from markup_cache import find_markup_files
+
+VIDEO_SUFFIXES = ('.mp4', '.avi')
+
+# Per-process helpers, created by init_worker
+_image_processor = None
+_markup_parser = None
+
+def init_worker(folder, lod_tolerance=0.0):
+    global _image_processor, _markup_parser
+    _image_processor = ImageProcessor()
+    _image_processor.lod_tolerance = lod_tolerance
+    _markup_parser = MarkupParser()
+    _markup_parser.open_cache(folder)
+
+def list_frames(folder, first=None, last=None):
+    """Returns [(image path, markup path or None)] of the folder ordered by frame number.
+    With a frame range only images with numeric names within it are included"""
+    image_files = find_files(folder, IMAGE_EXTENSIONS)
+    frame_index = FrameIndex(image_files, find_markup_files(folder))
+
+    frames = []
+    for img_path in image_files:
+        frame_num = get_frame_number(img_path)
+        if first is not None or last is not None:
+            if frame_num is None or (first is not None and frame_num < first) or (last is not None and frame_num > last):
+                continue
+        frames.append((frame_num is None, frame_num or 0, img_path))
+    frames.sort()
+    return [(img_path, frame_index.markup_file(img_path)) for _, _, img_path in frames]
+
+def fit_size(size, box):
+    """Size of an image of size (width, height) scaled to fit into box (width, height)"""
+    scale = min(box[0] / size[0], box[1] / size[1])
+    return max(int(size[0] * scale), 1), max(int(size[1] * scale), 1)
+
+def render_frame(img_path, txt_path, box=None):
+    """Annotated image with its file name in the corner, fitted into box (width, height) if given"""
+    display_size = None
+    if box is not None:
+        full_size = _image_processor.image_size(img_path)
+        if full_size is not None:
+            display_size = fit_size(full_size, box)
+    img = _image_processor.load_image(img_path, display_size)
+    if img is None:
+        raise ValueError("failed to load image")
+    if display_size is not None and (img.shape[1], img.shape[0]) != display_size:
+        img = cv2.resize(img, display_size, interpolation=cv2.INTER_AREA)
+
+    if txt_path:
+        img = _image_processor.apply_markup(img, _markup_parser.parse_markup_arrays(txt_path))
+
+    name = os.path.basename(img_path)
+    cv2.putText(img, name, (8, 24), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 4)
+    cv2.putText(img, name, (8, 24), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    return img
+
+def render_sheet(frames, columns, cell_size):
+    """Contact sheet of the frames in a grid with the given number of columns, each fitted into cell_size"""
+    rows = (len(frames) + columns - 1) // columns
+    sheet = np.zeros((rows * cell_size[1], columns * cell_size[0], 3), dtype=np.uint8)
+    errors = []
+    for i, (img_path, txt_path) in enumerate(frames):
+        try:
+            img = render_frame(img_path, txt_path, cell_size)
+        except Exception as e:
+            errors.append(f"{img_path} ({e})")
+            continue
+        x = (i % columns) * cell_size[0] + (cell_size[0] - img.shape[1]) // 2
+        y = (i // columns) * cell_size[1] + (cell_size[1] - img.shape[0]) // 2
+        sheet[y:y + img.shape[0], x:x + img.shape[1]] = img
+    return sheet, errors
+
+def render_task(task):
+    """Renders one output image: a single frame or a contact sheet. Writes it to output_path if given,
+    otherwise returns it. Returns (image or None, list of errors)"""
+    frames, columns, cell_size, output_path = task
+    if columns is None:
+        img_path, txt_path = frames[0]
+        try:
+            img, errors = render_frame(img_path, txt_path, cell_size), []
+        except Exception as e:
+            return None, [f"{img_path} ({e})"]
+    else:
+        img, errors = render_sheet(frames, columns, cell_size)
+
+    if output_path is not None:
+        # A kept extension OpenCV can't encode or an unwritable path fails this frame only
+        try:
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+            if not cv2.imwrite(output_path, img):
+                errors.append(f"{output_path} (failed to write)")
+        except (OSError, cv2.error) as e:
+            errors.append(f"{output_path} ({str(e).strip()})")
+        return None, errors
+    return img, errors
+
+def ordered_results(executor, fn, tasks, window):
+    """Like executor.map, but keeps at most window tasks in flight, so results of millions of frames
+    don't pile up in memory"""
+    pending = deque()
+    for task in tasks:
+        pending.append(executor.submit(fn, task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def make_tasks(frames, output, mosaic, cell_size, folder=None):
+    """Splits frames into render tasks, one per output image. Single frames keep their path relative
+    to folder and their format, so x.jpg and x.png don't overwrite each other"""
+    to_video = output.lower().endswith(VIDEO_SUFFIXES)
+    if mosaic is not None:
+        columns, rows = mosaic
+        per_task = columns * rows
+    else:
+        columns, per_task = None, 1
+
+    for start in range(0, len(frames), per_task):
+        chunk = frames[start:start + per_task]
+        if to_video:
+            output_path = None
+        elif mosaic is not None:
+            output_path = os.path.join(output, f"sheet_{start // per_task:06d}.jpg")
+        else:
+            img_path = chunk[0][0]
+            output_path = os.path.join(output, os.path.relpath(img_path, folder) if folder else os.path.basename(img_path))
+        yield chunk, columns, cell_size, output_path
+
+def batch_render(folder, output, first=None, last=None, mosaic=None, cell_size=None, fps=25, workers=None,
+                 lod_tolerance=0.0):
+    """Renders annotated frames of the folder into a folder of images or a video. Returns number of errors"""
+    frames = list_frames(folder, first, last)
+    if not frames:
+        print("No images found.")
+        return 0
+    if mosaic is not None and cell_size is None:
+        cell_size = (320, 180)
+
+    to_video = output.lower().endswith(VIDEO_SUFFIXES)
+    if not to_video:
+        os.makedirs(output, exist_ok=True)
+    per_task = mosaic[0] * mosaic[1] if mosaic is not None else 1
+    total = (len(frames) + per_task - 1) // per_task
+
+    writer = None
+    error_count = 0
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(folder, lod_tolerance)) as executor:
+        tasks = make_tasks(frames, output, mosaic, cell_size, folder)
+        for done, (img, errors) in enumerate(ordered_results(executor, render_task, tasks, 4 * workers), 1):
+            for error in errors:
+                print(f"\nSkipped: {error}")
+            error_count += len(errors)
+
+            if img is not None:
+                # Video frames must all have the size of the first one
+                if writer is None:
+                    video_size = (img.shape[1], img.shape[0])
+                    writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*'mp4v'), fps, video_size)
+                    if not writer.isOpened():
+                        raise RuntimeError(f"Failed to open video writer for {output}")
+                try:
+                    if (img.shape[1], img.shape[0]) != video_size:
+                        img = cv2.resize(img, video_size, interpolation=cv2.INTER_AREA)
+                    writer.write(img)
+                except cv2.error as e:
+                    print(f"\nSkipped: video frame {done} ({str(e).strip()})")
+                    error_count += 1
+            print(f"\rRendered {done}/{total}", end='', flush=True)
+    print()
+
+    if writer is not None:
+        writer.release()
+    return error_count
+
+def parse_size(value):
+    width, height = map(int, value.lower().split('x'))
+    return width, height
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Render annotated frames of a folder without a display, to images or a video.')
+    parser.add_argument('folder', help='Folder with images and markup')
+    parser.add_argument('--output', required=True, help='Output folder, or a video file (.mp4, .avi)')
+    parser.add_argument('--first', type=int, default=None, help='First frame number to render')
+    parser.add_argument('--last', type=int, default=None, help='Last frame number to render')
+    parser.add_argument('--mosaic', type=parse_size, default=None, help='Render contact sheets of COLUMNSxROWS frames')
+    parser.add_argument('--size', type=parse_size, default=None,
+                        help='Fit frames (mosaic cells) into WIDTHxHEIGHT, default: full size (320x180 cells)')
+    parser.add_argument('--fps', type=float, default=25, help='Video frame rate')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of worker processes')
+    parser.add_argument('--lod', type=float, default=0.0,
+                        help='Simplify polygons to this many pixels of the rendered size (0: draw every vertex)')
+    args = parser.parse_args()
+
+    error_count = batch_render(args.folder, args.output, args.first, args.last, args.mosaic, args.size,
+                               args.fps, args.workers, args.lod)
+    print("Done." if not error_count else f"Done with {error_count} errors.")
@@ -0,0 +1,111 @@
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+import tkinter as tk
+
+import cv2
+import numpy as np
+
+import markup_viewer
+from markup_viewer import MarkupViewer
+
+def make_dataset(folder, frames, size, polygons, vertices, seed=0):
+    """Write frames numbered 1..frames with random images and markup"""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    for frame in range(1, frames + 1):
+        img = rng.integers(0, 255, size=(height // 8, width // 8, 3), dtype=np.uint8)
+        cv2.imwrite(os.path.join(folder, f"{frame}.jpg"), cv2.resize(img, (width, height)))
+        with open(os.path.join(folder, f"{frame}.txt"), 'w') as f:
+            for _ in range(polygons):
+                coords = rng.uniform(0, 1, size=2 * vertices)
+                f.write(f"{rng.integers(0, 10)} " + " ".join(f"{c:.6f}" for c in coords) + "\n")
+
+def rss_mb():
+    """Current resident set size in MB (peak RSS where neither /proc nor psutil is available),
+    None if it can't be measured"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        pass
+    try:
+        import resource  # not available on Windows
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+def widget_count(widget):
+    return 1 + sum(widget_count(child) for child in widget.winfo_children())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Navigate the viewer many times and check that widgets and memory stay flat.')
+    parser.add_argument('--navigations', type=int, default=10000, help='Number of next/prev steps')
+    parser.add_argument('--frames', type=int, default=50, help='Number of generated frames')
+    parser.add_argument('--size', type=str, default='1280x720', help='Frame size, format: WIDTHxHEIGHT')
+    parser.add_argument('--report_every', type=int, default=1000, help='Steps between samples')
+    parser.add_argument('--tolerance_mb', type=float, default=64, help='Allowed RSS growth after warm-up')
+    parser.add_argument('--tolerance_items', type=float, default=0.1,
+                        help='Allowed relative growth of canvas items and Tk images after warm-up')
+    args = parser.parse_args()
+
+    # Navigation info dialogs would block the loop
+    markup_viewer.messagebox.showinfo = lambda *a, **k: None
+
+    width, height = map(int, args.size.lower().split('x'))
+    folder = tempfile.mkdtemp(prefix='viewer_soak_')
+    try:
+        make_dataset(folder, args.frames, (width, height), polygons=20, vertices=50)
+
+        root = tk.Tk()
+        root.geometry("1200x800")
+        viewer = MarkupViewer(root)
+        root.update()
+        viewer.load_folder(folder)
+        root.update()
+
+        samples = []
+        for step in range(1, args.navigations + 1):
+            # Mostly forward, with some zooming and stepping back like a reviewer would
+            if step % 10 == 0:
+                viewer.zoom_in()
+            elif step % 10 == 5:
+                viewer.zoom_out()
+            elif step % 7 == 0:
+                viewer.prev_image()
+            else:
+                viewer.next_image()
+            # Run the redraw that input debouncing would otherwise delay
+            viewer.render_scheduler.flush()
+            root.update()
+            if step % args.report_every == 0 or step == args.navigations:
+                # Tk images are the PhotoImages of tiles, which leak when replaced tiles stay referenced
+                sample = (step, widget_count(root), len(viewer.canvas.find_all()), len(root.image_names()), rss_mb())
+                samples.append(sample)
+                rss = f"{sample[4]:8.1f} MB" if sample[4] is not None else "n/a"
+                print(f"step {sample[0]:6d}: widgets {sample[1]:4d}  canvas items {sample[2]:6d}  "
+                      f"Tk images {sample[3]:5d}  RSS {rss}")
+        root.destroy()
+    finally:
+        shutil.rmtree(folder)
+
+    # The first sample is taken once caches are warm
+    first, last = samples[0], samples[-1]
+    ok = (last[1] == first[1]
+          and last[2] <= first[2] * (1 + args.tolerance_items)
+          and last[3] <= first[3] * (1 + args.tolerance_items))
+    rss = "RSS not measured"
+    if first[4] is not None and last[4] is not None:
+        ok = ok and last[4] - first[4] <= args.tolerance_mb
+        rss = f"RSS {first[4]:.1f} -> {last[4]:.1f} MB"
+    print("PASS" if ok else "FAIL", f"widgets {first[1]} -> {last[1]}, canvas items {first[2]} -> {last[2]}, "
+          f"Tk images {first[3]} -> {last[3]}, {rss}")
+    sys.exit(0 if ok else 1)
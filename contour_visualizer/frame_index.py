@@ -0,0 +1,65 @@
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+
+def get_frame_number(file_path):
+    """Extracts frame number from filename, None if the name is not a number"""
+    try:
+        return int(Path(file_path).stem)
+    except ValueError:
+        return None
+
+class FrameIndex:
+    """Precomputed lookups over the files of a folder, built once when the folder is opened"""
+    def __init__(self, image_files, txt_files):
+        # Frame numbers in ascending order with the matching positions in image_files
+        numbered = sorted(
+            (num, i) for i, num in ((i, get_frame_number(f)) for i, f in enumerate(image_files)) if num is not None
+        )
+        self.frame_numbers = [num for num, _ in numbered]
+        self.frame_indices = [i for _, i in numbered]
+
+        # Markup file stem -> path
+        self.markup_files = {Path(f).stem: f for f in txt_files}
+
+    def __len__(self):
+        """Number of images with numeric names"""
+        return len(self.frame_numbers)
+
+    def next_frame(self, frame_num):
+        """(index, frame number) of the first frame after frame_num, wrapping around to the first frame"""
+        if not self.frame_numbers:
+            return None
+        pos = bisect_right(self.frame_numbers, frame_num)
+        if pos == len(self.frame_numbers):
+            pos = 0
+        return self.frame_indices[pos], self.frame_numbers[pos]
+
+    def prev_frame(self, frame_num):
+        """(index, frame number) of the last frame before frame_num, wrapping around to the last frame"""
+        if not self.frame_numbers:
+            return None
+        pos = bisect_left(self.frame_numbers, frame_num) - 1
+        return self.frame_indices[pos], self.frame_numbers[pos]
+
+    def find_frame(self, frame_num):
+        """(index, frame number) of frame_num, or of the nearest higher frame. None if there is no such frame"""
+        pos = bisect_left(self.frame_numbers, frame_num)
+        if pos == len(self.frame_numbers):
+            return None
+        return self.frame_indices[pos], self.frame_numbers[pos]
+
+    def first_frame(self):
+        """(index, frame number) of the lowest frame, None if no image has a numeric name"""
+        if not self.frame_numbers:
+            return None
+        return self.frame_indices[0], self.frame_numbers[0]
+
+    def markup_file(self, img_path):
+        """Markup file for the image: same name, or frame number without leading zeros. None if missing"""
+        base_name = Path(img_path).stem
+        txt_path = self.markup_files.get(base_name)
+        if txt_path is None:
+            frame_num = get_frame_number(img_path)
+            if frame_num is not None:
+                txt_path = self.markup_files.get(str(frame_num))
+        return txt_path
@@ -0,0 +1,125 @@
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from image_pyramid import ImagePyramid
+
+# Loaded frame: image (None if it could not be loaded), possibly a reduced pyramid level,
+# the (width, height) of the full image, parsed MarkupArrays (empty list if there is no markup)
+# and the markup reading error message (None if markup was read or there is none)
+Frame = namedtuple('Frame', ['image', 'full_size', 'markup', 'markup_error'])
+
+class FramePrefetcher:
+    """Loads images and parses markup on background threads and keeps frames in a memory-bounded LRU cache"""
+    def __init__(self, image_processor, markup_parser, max_bytes=512 * 2**20, workers=2):
+        self.image_processor = image_processor
+        self.markup_parser = markup_parser
+        self.max_bytes = max_bytes
+
+        # (image path, image mtime, markup path, markup mtime, pyramid level) -> Frame, least recently used first
+        self.cache = OrderedDict()
+        self.cache_bytes = 0
+        self.pending = {}  # key -> Future of frames being rendered
+        # Reentrant: cancelling a future runs its done callback, which takes the lock, right away
+        self.lock = threading.RLock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+
+    @staticmethod
+    def _key(img_path, txt_path, scale):
+        """Cache key: paths with modification times, so edited files are rendered again, and pyramid level"""
+        def mtime(path):
+            try:
+                return os.stat(path).st_mtime_ns
+            except (OSError, TypeError):
+                return None
+        return (img_path, mtime(img_path), txt_path, mtime(txt_path), ImagePyramid.level_for_scale(scale))
+
+    def render(self, img_path, txt_path, scale=1.0):
+        """Loads image at a resolution sufficient for displaying it at scale and parses its markup"""
+        full_size = self.image_processor.image_size(img_path)
+        if full_size is None or scale >= 1:
+            img = self.image_processor.load_image(img_path)
+        else:
+            display_size = (full_size[0] * scale, full_size[1] * scale)
+            img = self.image_processor.load_image(img_path, display_size)
+        if img is None:
+            return Frame(None, None, [], None)
+        if full_size is None:
+            full_size = (img.shape[1], img.shape[0])
+
+        markup_data = []
+        markup_error = None
+        if txt_path:
+            try:
+                markup_data = self.markup_parser.parse_markup_arrays(txt_path)
+            except Exception as e:
+                markup_error = str(e)
+        return Frame(img, full_size, markup_data, markup_error)
+
+    def get(self, img_path, txt_path, scale=1.0):
+        """Returns Frame for the image displayed at scale, from cache, from a running prefetch or rendered right away"""
+        key = self._key(img_path, txt_path, scale)
+        with self.lock:
+            frame = self.cache.get(key)
+            if frame is not None:
+                self.cache.move_to_end(key)
+                return frame
+            future = self.pending.get(key)
+
+        if future is not None and not future.cancelled():
+            try:
+                return future.result()
+            except Exception:
+                pass  # render again below
+
+        frame = self.render(img_path, txt_path, scale)
+        with self.lock:
+            self._store(key, frame)
+        return frame
+
+    def prefetch(self, requests, scale=1.0):
+        """Starts rendering [(img_path, txt_path), ...] for display at scale in the background, in the given order.
+        Pending renders that are no longer requested are cancelled if they have not started yet"""
+        keys = [self._key(img_path, txt_path, scale) for img_path, txt_path in requests]
+        with self.lock:
+            for key, future in list(self.pending.items()):
+                if key not in keys:
+                    future.cancel()
+
+            for key, (img_path, txt_path) in zip(keys, requests):
+                if key in self.cache or key in self.pending:
+                    continue
+                future = self.executor.submit(self.render, img_path, txt_path, scale)
+                self.pending[key] = future
+                future.add_done_callback(lambda f, key=key: self._finish(key, f))
+
+    def _finish(self, key, future):
+        with self.lock:
+            if self.pending.get(key) is future:
+                del self.pending[key]
+            if not future.cancelled() and future.exception() is None:
+                self._store(key, future.result())
+
+    def _store(self, key, frame):
+        """Adds frame to the cache and evicts least recently used frames over the memory limit. Call with lock held"""
+        if key in self.cache:
+            return
+        self.cache[key] = frame
+        self.cache_bytes += self._size(frame)
+        while self.cache_bytes > self.max_bytes and len(self.cache) > 1:
+            _, evicted = self.cache.popitem(last=False)
+            self.cache_bytes -= self._size(evicted)
+
+    @staticmethod
+    def _size(frame):
+        return frame.image.nbytes if frame.image is not None else 0
+
+    def clear(self):
+        """Drops cached frames and cancels pending renders"""
+        with self.lock:
+            for future in list(self.pending.values()):
+                future.cancel()
+            self.pending.clear()
+            self.cache.clear()
+            self.cache_bytes = 0
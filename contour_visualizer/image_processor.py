@@ -1,6 +1,10 @@
 import cv2
 import numpy as np
-from PIL import Image, ImageTk
+
+from markup_parser import MarkupArrays, to_markup_arrays
+from image_pyramid import ImagePyramid
+from common.geometry import simplify_polygon
+from common.profiler import profiler
 
 class ImageProcessor:
     def __init__(self):
@@ -17,36 +21,158 @@ class ImageProcessor:
             8: (0, 0, 128),    # Dark blue
             9: (128, 128, 0)   # Olive
         }
+        # Draw polygons in batches per color instead of one OpenCV call per vertex and edge.
+        # Batching has a fixed per-frame cost, so sparse markup is still drawn per vertex
+        self.batched_rendering = True
+        self.batched_min_vertices = 1000
+        # Footprint of a filled vertex marker of radius 3, used to stamp all markers at once
+        self.marker_radius = 3
+        self.marker_kernel = np.zeros((7, 7), dtype=np.uint8)
+        cv2.circle(self.marker_kernel, (3, 3), 3, 1, -1)
+        # Downscaled levels of large images for zoomed out display
+        self.pyramid = ImagePyramid()
+        # Level of detail: polygons are simplified to this many pixels of the displayed size before
+        # drawing, so zoomed out dense markup draws few vertices. 0 draws every vertex
+        self.lod_tolerance = 0.0
+    
+    def image_size(self, path):
+        """Returns full (width, height) of the image without decoding it, None if the header can't be read"""
+        try:
+            return self.pyramid.image_size(path)
+        except OSError:
+            return None
     
-    def load_image(self, path):
-        """Loads image from specified path"""
-        return cv2.imread(path)
+    @profiler.timed('imread')
+    def load_image(self, path, display_size=None):
+        """Loads image from specified path. If display size (width, height) is given, the cheapest
+        pyramid level that is still at least that large is read instead of the full image"""
+        full_size = self.image_size(path) if display_size is not None else None
+        if full_size is None:
+            profiler.count_file(path)
+            return cv2.imread(path)
+        scale = max(display_size[0] / full_size[0], display_size[1] / full_size[1])
+        return self.pyramid.read(path, ImagePyramid.level_for_scale(scale))
     
+    def simplify_markup(self, markup_data, display_size, tolerance=None):
+        """Returns MarkupArrays with every polygon simplified (Douglas-Peucker) to tolerance pixels
+        (lod_tolerance by default) at display_size (width, height)"""
+        markup_data = to_markup_arrays(markup_data)
+        tolerance = self.lod_tolerance if tolerance is None else tolerance
+        class_ids, offsets, vertices = markup_data
+        if tolerance <= 0 or len(vertices) <= 3 * len(class_ids):
+            return markup_data
+        
+        scale = np.array(display_size, dtype=np.float32)
+        points = vertices * scale
+        simplified = []
+        for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist()):
+            simplified.append(simplify_polygon(points[start:end], tolerance))
+        sizes = [len(polygon) for polygon in simplified]
+        return MarkupArrays(
+            class_ids,
+            np.concatenate(([0], np.cumsum(sizes, dtype=np.int64))),
+            (np.concatenate(simplified) / scale).astype(np.float32) if simplified else vertices
+        )
+    
+    @profiler.timed('apply_markup')
     def apply_markup(self, img, markup_data):
-        """Applies markup overlay to the image"""
+        """Applies markup overlay to the image. markup_data is MarkupArrays or [(class_id, [(x, y), ...]), ...]"""
+        markup_data = to_markup_arrays(markup_data)
+        if img is not None and self.lod_tolerance > 0:
+            markup_data = self.simplify_markup(markup_data, (img.shape[1], img.shape[0]))
+        if self.batched_rendering and len(markup_data.vertices) >= self.batched_min_vertices:
+            return self.apply_markup_batched(img, markup_data)
+        return self.apply_markup_per_vertex(img, markup_data)
+    
+    def apply_markup_batched(self, img, markup_data):
+        """Applies markup overlay grouping polygons by color: edges are drawn with one cv2.polylines call
+        per group and all vertex markers are stamped at once by dilating their centers"""
+        if img is None:
+            return None
+            
+        img_height, img_width = img.shape[:2]
+        class_ids, offsets, vertices = to_markup_arrays(markup_data)
+        if len(vertices) == 0:
+            return img
+            
+        pixel_points = (vertices * np.array([img_width, img_height], dtype=np.float64)).astype(np.int32)
+        polygons = np.split(pixel_points, offsets[1:-1])
+        sizes = np.diff(offsets)
+        
+        # Group classes sharing a color
+        groups = {}
+        for class_id in np.unique(class_ids).tolist():
+            groups.setdefault(self.colors.get(class_id, (255, 255, 255)), []).append(class_id)
+            
+        # Index of the color group whose vertex marker covers each pixel (0 - none), over the region
+        # spanned by the vertices. The map is padded by the marker radius so that markers of vertices
+        # just outside that region are kept
+        r = self.marker_radius
+        x0 = min(max(int(pixel_points[:, 0].min()) - r, 0), img_width)
+        x1 = max(min(int(pixel_points[:, 0].max()) + r + 1, img_width), x0)
+        y0 = min(max(int(pixel_points[:, 1].min()) - r, 0), img_height)
+        y1 = max(min(int(pixel_points[:, 1].max()) + r + 1, img_height), y0)
+        marker_groups = np.zeros((y1 - y0 + 2 * r, x1 - x0 + 2 * r),
+                                 dtype=np.uint8 if len(groups) < 256 else np.uint16)
+        palette = np.zeros((len(groups) + 1, 3), dtype=img.dtype)
+        
+        for group, (color, group_class_ids) in enumerate(groups.items(), 1):
+            in_group = np.isin(class_ids, group_class_ids)
+            indices = np.nonzero(in_group)[0]
+            
+            # Polygons with more than 2 points are closed, 2 points make a single segment
+            closed = [polygons[i] for i in indices if sizes[i] > 2]
+            open_ = [polygons[i] for i in indices if sizes[i] == 2]
+            if closed:
+                cv2.polylines(img, closed, True, color, 2)
+            if open_:
+                cv2.polylines(img, open_, False, color, 2)
+                
+            points = pixel_points[np.repeat(in_group, sizes)]
+            xs = points[:, 0] - x0 + r
+            ys = points[:, 1] - y0 + r
+            inside = (xs >= 0) & (xs < marker_groups.shape[1]) & (ys >= 0) & (ys < marker_groups.shape[0])
+            marker_groups[ys[inside], xs[inside]] = group
+            palette[group] = color
+            
+        # Grow marker centers into disks and paint all of them in one pass, on top of the edges
+        marker_groups = cv2.dilate(marker_groups, self.marker_kernel)[r:r + y1 - y0, r:r + x1 - x0]
+        covered = marker_groups > 0
+        img[y0:y1, x0:x1][covered] = palette[marker_groups[covered]]
+            
+        # Add class label near first point
+        for i, class_id in enumerate(class_ids.tolist()):
+            if sizes[i] > 0:
+                px, py = polygons[i][0].tolist()
+                cv2.putText(img, str(class_id), (px + 5, py + 5),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, self.colors.get(class_id, (255, 255, 255)), 2)
+                
+        return img
+    
+    def apply_markup_per_vertex(self, img, markup_data):
+        """Applies markup overlay drawing every vertex and edge with its own OpenCV call"""
         if img is None:
             return None
             
         img_height, img_width = img.shape[:2]
+        class_ids, offsets, vertices = to_markup_arrays(markup_data)
+        
+        # Convert normalized coordinates to pixel coordinates for all vertices at once
+        all_pixel_points = (vertices * np.array([img_width, img_height], dtype=np.float64)).astype(np.int32).tolist()
+        offsets = offsets.tolist()
         
         # Apply markup to image
-        for class_id, points in markup_data:
+        for i, class_id in enumerate(class_ids.tolist()):
             color = self.colors.get(class_id, (255, 255, 255))  # White color as default
-            
-            # Convert normalized coordinates to pixel coordinates
-            pixel_points = []
-            for x, y in points:
-                px = int(x * img_width)
-                py = int(y * img_height)
-                pixel_points.append((px, py))
+            pixel_points = all_pixel_points[offsets[i]:offsets[i + 1]]
                 
             # Draw points and lines
-            for i, (px, py) in enumerate(pixel_points):
+            for j, (px, py) in enumerate(pixel_points):
                 cv2.circle(img, (px, py), 3, color, -1)
                 
                 # Connect points with lines
-                if i > 0:
-                    prev_px, prev_py = pixel_points[i-1]
+                if j > 0:
+                    prev_px, prev_py = pixel_points[j-1]
                     cv2.line(img, (prev_px, prev_py), (px, py), color, 2)
                     
             # Connect first and last points if more than 2 points
@@ -62,20 +188,3 @@ class ImageProcessor:
                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
                 
         return img
-    
-    def prepare_image_for_tkinter(self, cv_img, width=None, height=None):
-        """Converts OpenCV image to Tkinter format"""
-        if cv_img is None:
-            return None
-            
-        # Convert from BGR to RGB (Pillow uses RGB)
-        img_rgb = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
-        pil_img = Image.fromarray(img_rgb)
-        
-        # Scale image if dimensions provided
-        if width is not None and height is not None:
-            if width > 0 and height > 0:  # Protect against invalid dimensions
-                pil_img = pil_img.resize((width, height), Image.LANCZOS)
-                
-        # Convert to Tkinter format
-        return ImageTk.PhotoImage(pil_img)
\ No newline at end of file
@@ -0,0 +1,117 @@
+import os
+import math
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+from PIL import Image
+
+from common.file_discovery import find_files, IMAGE_EXTENSIONS
+from common.profiler import profiler
+
+class ImagePyramid:
+    """On-disk cache of downscaled image levels, kept in a hidden folder next to the images.
+    Level k holds the image reduced 2^k times. Missing levels are decoded with OpenCV reduced-resolution
+    JPEG decoding, and written to the cache on first use if write_levels is set"""
+    CACHE_DIR = '.pyramid'
+    MAX_LEVEL = 3
+    REDUCED_FLAGS = {
+        1: cv2.IMREAD_REDUCED_COLOR_2,
+        2: cv2.IMREAD_REDUCED_COLOR_4,
+        3: cv2.IMREAD_REDUCED_COLOR_8,
+    }
+
+    def __init__(self, write_levels=False):
+        # Save levels decoded without a cache file for next time. Off by default, so just reading
+        # a dataset doesn't write into it
+        self.write_levels = write_levels
+
+    @classmethod
+    def level_for_scale(cls, scale):
+        """Highest level whose resolution is still at least scale times the full image"""
+        if scale <= 0 or scale >= 1:
+            return 0
+        return min(int(math.floor(math.log2(1 / scale) + 1e-9)), cls.MAX_LEVEL)
+
+    @staticmethod
+    def image_size(path):
+        """(width, height) of the full image, read from the file header without decoding pixels"""
+        with Image.open(path) as img:
+            return img.size
+
+    def level_path(self, path, level):
+        """Cache file of the level, e.g. .pyramid/a.png.L1.jpg. The full name is kept, as a.jpg and a.png may share a folder"""
+        folder, name = os.path.split(path)
+        return os.path.join(folder, self.CACHE_DIR, f"{name}.L{level}.jpg")
+
+    def read(self, path, level):
+        """Reads the image at the given level, from the cache if it is up to date"""
+        if level <= 0:
+            profiler.count_file(path)
+            return cv2.imread(path)
+
+        cached_path = self.level_path(path, level)
+        try:
+            if os.path.getmtime(cached_path) >= os.path.getmtime(path):
+                img = cv2.imread(cached_path)
+                if img is not None:
+                    profiler.count_file(cached_path)
+                    return img
+        except OSError:
+            pass
+
+        profiler.count_file(path)
+        img = cv2.imread(path, self.REDUCED_FLAGS[level])
+        if img is not None and self.write_levels:
+            self._write(cached_path, img)
+        return img
+
+    def build(self, path):
+        """Decodes the full image once and writes all levels to the cache. Returns number of levels written"""
+        img = cv2.imread(path)
+        if img is None:
+            return 0
+        height, width = img.shape[:2]
+        written = 0
+        for level in range(1, self.MAX_LEVEL + 1):
+            size = (max(width >> level, 1), max(height >> level, 1))
+            img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+            written += self._write(self.level_path(path, level), img)
+        return written
+
+    @staticmethod
+    def _write(cached_path, img):
+        """Writes a cache level atomically; read-only folders are silently skipped. Every writer gets its
+        own temporary file, so threads or processes building the same level don't clash"""
+        tmp_path = None
+        try:
+            folder = os.path.dirname(cached_path)
+            os.makedirs(folder, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=os.path.basename(cached_path) + '.', suffix='.tmp.jpg')
+            os.close(fd)
+            if not cv2.imwrite(tmp_path, img, [cv2.IMWRITE_JPEG_QUALITY, 90]):
+                os.remove(tmp_path)
+                return False
+            os.replace(tmp_path, cached_path)
+            return True
+        except (OSError, cv2.error):
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+def _build_one(path):
+    return ImagePyramid().build(path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Pre-build downscaled pyramid levels for all images of a folder.')
+    parser.add_argument('folder', help='Folder with images')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of worker processes')
+    args = parser.parse_args()
+
+    image_files = find_files(args.folder, IMAGE_EXTENSIONS)
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for done, _ in enumerate(executor.map(_build_one, image_files, chunksize=16), 1):
+            print(f"\rProcessed {done}/{len(image_files)}", end='', flush=True)
+    print("\nDone.")
@@ -0,0 +1,163 @@
+import os
+import json
+import struct
+import argparse
+import numpy as np
+
+from common.file_discovery import find_files
+
+def read_flat_markup(txt_path):
+    """Parse a markup file like MarkupParser.parse_markup_file into flat lists:
+    class ids, vertex count of every polygon and x, y coordinates of all vertices back to back."""
+    class_ids = []
+    poly_sizes = []
+    coords = []
+    with open(txt_path, 'r') as file:
+        for line in file:
+            values = line.split()
+            if len(values) > 1:
+                n = (len(values) - 1) // 2
+                class_ids.append(int(values[0]))
+                poly_sizes.append(n)
+                coords.extend(map(float, values[1:1 + 2 * n]))
+    return class_ids, poly_sizes, coords
+
+class MarkupCache:
+    """Packed binary store of all polygons of a markup folder.
+
+    The file holds a JSON header followed by four arrays:
+    frame_offsets (int64) - first polygon of every markup file, plus the polygon count at the end
+    class_ids (int32) - class of every polygon
+    poly_offsets (int64) - first vertex of every polygon, plus the vertex count at the end
+    vertices (float32, N x 2) - normalized x, y of all vertices back to back
+    Arrays are memory-mapped, so per-frame data is read as zero-copy views.
+    """
+    MAGIC = b'MKUPCCH1'
+    DEFAULT_NAME = 'markup_cache.bin'
+    ALIGN = 64
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(self.MAGIC)) != self.MAGIC:
+                raise ValueError(f"Not a markup cache file: {path}")
+            header_len, = struct.unpack('<Q', f.read(8))
+            header = json.loads(f.read(header_len).decode('utf-8'))
+        data_start = self._align(len(self.MAGIC) + 8 + header_len)
+
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            shape = tuple(spec['shape'])
+            if 0 in shape:
+                arrays[name] = np.zeros(shape, dtype=spec['dtype'])
+            else:
+                arrays[name] = np.memmap(path, dtype=spec['dtype'], mode='r',
+                                         offset=data_start + spec['offset'], shape=shape)
+        self.frame_offsets = arrays['frame_offsets']
+        self.class_ids = arrays['class_ids']
+        self.poly_offsets = arrays['poly_offsets']
+        self.vertices = arrays['vertices']
+        # file name -> (frame index, size, mtime_ns) of the markup file when the cache was built
+        self.entries = {name: (i, size, mtime) for i, (name, size, mtime) in enumerate(header['files'])}
+
+    @classmethod
+    def _align(cls, value):
+        return (value + cls.ALIGN - 1) // cls.ALIGN * cls.ALIGN
+
+    @classmethod
+    def open(cls, folder):
+        """Open the cache stored in folder, or return None if there is no usable cache."""
+        path = os.path.join(folder, cls.DEFAULT_NAME)
+        if not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def get(self, file_path):
+        """Return (class_ids, offsets, vertices) for a markup file, or None if it is not cached
+        or changed on disk since the cache was built. vertices is a view into the mapped file;
+        offsets index into vertices, with the vertex count at the end."""
+        entry = self.entries.get(os.path.basename(file_path))
+        if entry is None:
+            return None
+        index, size, mtime = entry
+        try:
+            st = os.stat(file_path)
+            if st.st_size != size or st.st_mtime_ns != mtime:
+                return None
+        except FileNotFoundError:
+            pass  # text file is optional once cached
+        p0, p1 = self.frame_offsets[index], self.frame_offsets[index + 1]
+        poly_offsets = self.poly_offsets[p0:p1 + 1]
+        v0, v1 = poly_offsets[0], poly_offsets[-1]
+        return self.class_ids[p0:p1], poly_offsets - v0, self.vertices[v0:v1]
+
+    @classmethod
+    def build(cls, folder, output_path=None):
+        """Parse every .txt markup file in folder into a cache file. Files that fail to parse are left out.
+        Returns the path of the written cache."""
+        output_path = output_path or os.path.join(folder, cls.DEFAULT_NAME)
+        files = []
+        frame_offsets = [0]
+        class_ids = []
+        poly_offsets = [0]
+        coords = []
+        for txt_path in find_files(folder, {'.txt'}):
+            try:
+                file_class_ids, file_poly_sizes, file_coords = read_flat_markup(txt_path)
+                st = os.stat(txt_path)
+            except (OSError, ValueError) as e:
+                print(f"Skipped: {os.path.basename(txt_path)} ({e})")
+                continue
+            files.append((os.path.basename(txt_path), st.st_size, st.st_mtime_ns))
+            class_ids.extend(file_class_ids)
+            for n in file_poly_sizes:
+                poly_offsets.append(poly_offsets[-1] + n)
+            coords.extend(file_coords)
+            frame_offsets.append(len(class_ids))
+
+        arrays = {
+            'frame_offsets': np.array(frame_offsets, dtype=np.int64),
+            'class_ids': np.array(class_ids, dtype=np.int32),
+            'poly_offsets': np.array(poly_offsets, dtype=np.int64),
+            'vertices': np.array(coords, dtype=np.float32).reshape(-1, 2),
+        }
+        specs = {}
+        offset = 0
+        for name, array in arrays.items():
+            specs[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset = cls._align(offset + array.nbytes)
+        header = json.dumps({'files': files, 'arrays': specs}).encode('utf-8')
+        data_start = cls._align(len(cls.MAGIC) + 8 + len(header))
+
+        tmp_path = output_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(cls.MAGIC)
+            f.write(struct.pack('<Q', len(header)))
+            f.write(header)
+            for name, array in arrays.items():
+                f.seek(data_start + specs[name]['offset'])
+                f.write(array.tobytes())
+        os.replace(tmp_path, output_path)
+        return output_path
+
+def find_markup_files(folder):
+    """Sorted paths of the markup files of the folder: its .txt files, plus the files stored in its
+    markup cache whose text files were removed"""
+    txt_files = set(find_files(folder, {'.txt'}))
+    cache = MarkupCache.open(folder)
+    if cache is not None:
+        txt_files.update(os.path.join(folder, name) for name in cache.entries)
+    return sorted(txt_files)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build a binary markup cache for a folder of .txt markup files.')
+    parser.add_argument('folder', help='Folder with markup files')
+    parser.add_argument('--output', help=f'Cache file path (defaults to <folder>/{MarkupCache.DEFAULT_NAME})')
+    args = parser.parse_args()
+
+    path = MarkupCache.build(args.folder, args.output)
+    cache = MarkupCache(path)
+    print(f"Cached {len(cache.entries)} files, {len(cache.class_ids)} polygons, {len(cache.vertices)} vertices to {path}")
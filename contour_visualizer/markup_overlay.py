@@ -0,0 +1,111 @@
+import tkinter as tk
+
+import numpy as np
+
+from common.profiler import profiler
+
+class MarkupOverlay:
+    """Draws markup as canvas vector items above the image tiles. Zooming only transforms item
+    coordinates, and class visibility and line width are item options, so none of them re-render pixels"""
+    TAG = "markup"
+    EDGE_TAG = "markup_edge"
+
+    def __init__(self, canvas, image_processor):
+        self.canvas = canvas
+        self.image_processor = image_processor
+        self.line_width = 2
+        self.marker_radius = 3
+        # Vertex markers are one canvas item each, so they are left out of very dense markup.
+        # hidden_markers is the number of vertices drawn without a marker, shown by the viewer
+        self.max_vertex_markers = 5000
+        self.hidden_markers = 0
+        self.hidden_classes = set()
+        self.visible = True
+        self.zoom = 1.0  # Zoom the item coordinates currently correspond to
+        # Markup is simplified for the zoom it is drawn at (see ImageProcessor.lod_tolerance) and
+        # drawn again once zoom moves further than this factor away from it
+        self.lod_zoom = 1.0
+        self.lod_range = 2.0
+        self.markup_data = []
+        self.full_size = None
+
+    def tk_color(self, class_id):
+        """Tk color of the class, matching the color markup has when drawn on the BGR image"""
+        b, g, r = self.image_processor.colors.get(class_id, (255, 255, 255))
+        return f"#{r:02x}{g:02x}{b:02x}"
+
+    def clear(self):
+        self.canvas.delete(self.TAG)
+
+    @profiler.timed('overlay')
+    def draw(self, markup_data, full_size, zoom):
+        """Replaces the overlay with markup of an image of full_size (width, height) displayed at zoom"""
+        self.clear()
+        self.hidden_markers = 0
+        self.zoom = self.lod_zoom = zoom
+        self.markup_data = markup_data
+        self.full_size = full_size
+        class_ids, offsets, vertices = self.image_processor.simplify_markup(
+            markup_data, (full_size[0] * zoom, full_size[1] * zoom))
+        if len(vertices) == 0:
+            return
+
+        points = vertices * np.array([full_size[0] * zoom, full_size[1] * zoom], dtype=np.float64)
+        draw_markers = len(points) <= self.max_vertex_markers
+        if not draw_markers:
+            self.hidden_markers = len(points)
+        for i, class_id in enumerate(class_ids.tolist()):
+            polygon = points[offsets[i]:offsets[i + 1]]
+            if len(polygon) == 0:
+                continue
+            color = self.tk_color(class_id)
+            tags = (self.TAG, f"class{class_id}")
+            state = self._state(class_id)
+
+            # Edges, closed if more than 2 points
+            if len(polygon) > 1:
+                coords = polygon if len(polygon) == 2 else np.vstack([polygon, polygon[:1]])
+                self.canvas.create_line(*coords.ravel().tolist(), fill=color, width=self.line_width,
+                                        tags=tags + (self.EDGE_TAG,), state=state)
+
+            # Vertex markers: round-capped dots keep their size when coordinates are scaled
+            if draw_markers:
+                for x, y in polygon.tolist():
+                    self.canvas.create_line(x, y, x + 0.01, y, fill=color, width=2 * self.marker_radius + 1,
+                                            capstyle=tk.ROUND, tags=tags, state=state)
+
+            # Add class label near first point
+            x, y = polygon[0].tolist()
+            self.canvas.create_text(x + 5, y + 5, text=str(class_id), fill=color, anchor=tk.SW,
+                                    font=("Helvetica", 12, "bold"), tags=tags, state=state)
+
+    def set_zoom(self, zoom):
+        """Moves all items to their positions at the new zoom"""
+        if self.image_processor.lod_tolerance > 0 and self.full_size is not None \
+                and not 1 / self.lod_range <= zoom / self.lod_zoom <= self.lod_range:
+            self.draw(self.markup_data, self.full_size, zoom)
+            return
+        if zoom != self.zoom:
+            ratio = zoom / self.zoom
+            self.canvas.scale(self.TAG, 0, 0, ratio, ratio)
+            self.zoom = zoom
+
+    def set_line_width(self, width):
+        self.line_width = max(1, width)
+        self.canvas.itemconfig(self.EDGE_TAG, width=self.line_width)
+
+    def toggle_class(self, class_id):
+        """Shows or hides markup of one class"""
+        self.hidden_classes ^= {class_id}
+        self.canvas.itemconfig(f"class{class_id}", state=self._state(class_id))
+
+    def toggle_visible(self):
+        """Shows or hides all markup"""
+        self.visible = not self.visible
+        self.canvas.itemconfig(self.TAG, state=tk.NORMAL if self.visible else tk.HIDDEN)
+        if self.visible:
+            for class_id in self.hidden_classes:
+                self.canvas.itemconfig(f"class{class_id}", state=tk.HIDDEN)
+
+    def _state(self, class_id):
+        return tk.NORMAL if self.visible and class_id not in self.hidden_classes else tk.HIDDEN
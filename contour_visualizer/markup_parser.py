@@ -1,11 +1,49 @@
+from collections import namedtuple
+import numpy as np
+
+from markup_cache import MarkupCache, read_flat_markup
+from common.profiler import profiler
+
+# Compact markup of one frame: class id of every polygon, start of every polygon in vertices
+# (plus the vertex count at the end) and an (N, 2) float32 array of normalized vertices
+MarkupArrays = namedtuple('MarkupArrays', ['class_ids', 'offsets', 'vertices'])
+
+def to_markup_arrays(markup_data):
+    """Converts [(class_id, [(x, y), ...]), ...] markup to MarkupArrays (returned as is if already converted)"""
+    if isinstance(markup_data, MarkupArrays):
+        return markup_data
+    class_ids = [class_id for class_id, _ in markup_data]
+    sizes = [len(points) for _, points in markup_data]
+    vertices = [p for _, points in markup_data for p in points]
+    return MarkupArrays(
+        np.array(class_ids, dtype=np.int32),
+        np.concatenate(([0], np.cumsum(sizes, dtype=np.int64))),
+        np.array(vertices, dtype=np.float32).reshape(-1, 2)
+    )
+
 class MarkupParser:
     def __init__(self):
-        pass
+        self.cache = None
+        
+    def open_cache(self, folder):
+        """Uses the binary markup cache of the folder if one was built, see markup_cache.py"""
+        self.cache = MarkupCache.open(folder)
+        return self.cache is not None
         
     def parse_markup_file(self, file_path):
         """Парсит файл разметки и возвращает данные в формате [(class_id, [(x1, y1), (x2, y2), ...]), ...]"""
         markup_data = []
         
+        if self.cache is not None:
+            cached = self.cache.get(file_path)
+            if cached is not None:
+                class_ids, offsets, vertices = cached
+                points = [tuple(p) for p in vertices.tolist()]
+                offsets = offsets.tolist()
+                return [(class_id, points[offsets[i]:offsets[i + 1]])
+                        for i, class_id in enumerate(class_ids.tolist())]
+        
+        profiler.count_file(file_path)
         try:
             with open(file_path, 'r') as file:
                 for line in file:
@@ -22,4 +60,23 @@ class MarkupParser:
                         
             return markup_data
         except Exception as e:
-            raise Exception(f"Ошибка при чтении файла разметки: {e}")
\ No newline at end of file
+            raise Exception(f"Ошибка при чтении файла разметки: {e}")
+            
+    @profiler.timed('parse')
+    def parse_markup_arrays(self, file_path):
+        """Parses markup file into MarkupArrays without creating a Python object per vertex"""
+        if self.cache is not None:
+            cached = self.cache.get(file_path)
+            if cached is not None:
+                return MarkupArrays(*cached)
+                
+        profiler.count_file(file_path)
+        try:
+            class_ids, poly_sizes, coords = read_flat_markup(file_path)
+        except Exception as e:
+            raise Exception(f"Ошибка при чтении файла разметки: {e}")
+        return MarkupArrays(
+            np.array(class_ids, dtype=np.int32),
+            np.concatenate(([0], np.cumsum(poly_sizes, dtype=np.int64))),
+            np.array(coords, dtype=np.float32).reshape(-1, 2)
+        )
@@ -1,11 +1,20 @@
 import os
-import glob
+import time
 from pathlib import Path
 import tkinter as tk
 from tkinter import filedialog, simpledialog, messagebox
 
 from image_processor import ImageProcessor
 from markup_parser import MarkupParser
+from frame_prefetcher import FramePrefetcher
+from frame_index import FrameIndex, get_frame_number
+from tile_renderer import TileRenderer
+from image_pyramid import ImagePyramid
+from markup_overlay import MarkupOverlay
+from render_scheduler import RenderScheduler
+from markup_cache import find_markup_files
+from common.file_discovery import find_files, IMAGE_EXTENSIONS
+from common.profiler import profiler
 
 class MarkupViewer:
     def __init__(self, root):
@@ -19,6 +28,7 @@ class MarkupViewer:
         self.current_index = 0
         self.image_files = []
         self.txt_files = []
+        self.frame_index = FrameIndex([], [])
         self.base_path = ""
         self.current_image_path = ""
         self.current_txt_path = ""
@@ -26,6 +36,12 @@ class MarkupViewer:
         # Helper classes
         self.image_processor = ImageProcessor()
         self.markup_parser = MarkupParser()
+        # Markup finer than a screen pixel is simplified, see MarkupOverlay
+        self.image_processor.lod_tolerance = 1.0
+        
+        # Frames around the current one are loaded and rendered in the background
+        self.prefetch_count = 3
+        self.frame_prefetcher = FramePrefetcher(self.image_processor, self.markup_parser)
         
         # Zoom and pan settings
         self.zoom_factor = 1.0
@@ -34,6 +50,19 @@ class MarkupViewer:
         self.start_x = 0
         self.start_y = 0
         self.current_image = None
+        self.current_level = 0  # Pyramid level of the displayed image
+        
+        # Only tiles of the zoomed image around the visible region are resampled. A fast filter
+        # is used while zooming and panning, and a high quality pass once input is idle
+        self.tile_renderer = TileRenderer()
+        self.tile_items = {}  # (column, row) -> (canvas item, PhotoImage)
+        self.high_quality_delay = 250  # ms
+        self.high_quality_job = None
+        
+        # Bursts of zoom and navigation input are coalesced into one redraw once input settles,
+        # and tiles and pyramid levels are resampled off the Tk thread
+        self.render_scheduler = RenderScheduler(self.root)
+        self.input_delay = 40  # ms
         
         # Create button frame
         self.button_frame = tk.Frame(self.root)
@@ -80,7 +109,8 @@ class MarkupViewer:
         
         self.help_text = tk.Label(
             self.help_frame, 
-            text="Controls: ← (prev), → (next), + (zoom in), - (zoom out), 0 (reset zoom), Mouse wheel (zoom), Left click + drag (pan)",
+            text="Controls: ← (prev), → (next), + (zoom in), - (zoom out), 0 (reset zoom), Mouse wheel (zoom), Left click + drag (pan), "
+                 "H (show/hide markup), Ctrl+0..9 (show/hide class), [ ] (line width)",
             anchor=tk.W,
             justify=tk.LEFT,
             bg="#efefef",
@@ -109,8 +139,12 @@ class MarkupViewer:
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
         # Configure scrollbars
-        self.h_scrollbar.config(command=self.canvas.xview)
-        self.v_scrollbar.config(command=self.canvas.yview)
+        self.h_scrollbar.config(command=self.scroll_x)
+        self.v_scrollbar.config(command=self.scroll_y)
+        self.canvas.bind("<Configure>", lambda event: self.render_visible_tiles())
+        
+        # Markup is drawn as vector items above the image, so zoom doesn't resample it
+        self.markup_overlay = MarkupOverlay(self.canvas, self.image_processor)
         
         # Overlay frame for file info
         self.overlay_frame = tk.Frame(self.canvas, bg='#333333', bd=0)
@@ -119,6 +153,7 @@ class MarkupViewer:
         # Overlay text for file names
         self.overlay_text = tk.StringVar()
         self.overlay_text.set("No active files")
+        self.overlay_files = "No active files"
         self.overlay_label = tk.Label(
             self.overlay_frame, 
             textvariable=self.overlay_text, 
@@ -130,6 +165,23 @@ class MarkupViewer:
             anchor='w'
         )
         self.overlay_label.pack(fill=tk.X)
+        
+        # Live stage timings and counters in the top right corner when profiling is enabled, see profiler.py
+        self.stats_interval = 500  # ms
+        self.stats_text = tk.StringVar()
+        self.stats_label = tk.Label(
+            self.canvas,
+            textvariable=self.stats_text,
+            bg='#333333',
+            fg='white',
+            font=("Courier", 9),
+            justify=tk.LEFT,
+            padx=10,
+            pady=5
+        )
+        if profiler.enabled:
+            self.stats_label.place(relx=1, rely=0, anchor='ne')
+            self.update_stats()
 
         # Bind keyboard and mouse events
         self.root.bind("<Left>", lambda event: self.prev_image())
@@ -137,6 +189,11 @@ class MarkupViewer:
         self.root.bind("<plus>", lambda event: self.zoom_in())
         self.root.bind("<minus>", lambda event: self.zoom_out())
         self.root.bind("<0>", lambda event: self.reset_zoom())
+        self.root.bind("<h>", lambda event: self.markup_overlay.toggle_visible())
+        self.root.bind("<bracketleft>", lambda event: self.markup_overlay.set_line_width(self.markup_overlay.line_width - 1))
+        self.root.bind("<bracketright>", lambda event: self.markup_overlay.set_line_width(self.markup_overlay.line_width + 1))
+        for class_id in range(10):
+            self.root.bind(f"<Control-Key-{class_id}>", lambda event, c=class_id: self.markup_overlay.toggle_class(c))
         
         # Bind mouse events for panning
         self.canvas.bind("<ButtonPress-1>", self.start_pan)
@@ -150,131 +207,101 @@ class MarkupViewer:
         
     def open_folder(self):
         """Opens folder selection dialog and loads file lists"""
-        self.base_path = filedialog.askdirectory(title="Select folder with images and markup")
-        if not self.base_path:
+        folder = filedialog.askdirectory(title="Select folder with images and markup")
+        if not folder:
             return
+        self.load_folder(folder)
+        
+    def load_folder(self, folder):
+        """Loads file lists of the folder and shows its first image"""
+        self.base_path = folder
             
-        # Get file lists
-        self.image_files = sorted(glob.glob(os.path.join(self.base_path, "*.jpeg")))
-        if not self.image_files:
-            self.image_files = sorted(glob.glob(os.path.join(self.base_path, "*.jpg")))
-        if not self.image_files:
-            self.image_files = sorted(glob.glob(os.path.join(self.base_path, "*.png")))
-            
-        self.txt_files = sorted(glob.glob(os.path.join(self.base_path, "*.txt")))
+        # Get file lists, folders may mix image formats
+        self.image_files = find_files(self.base_path, IMAGE_EXTENSIONS)
+        # Markup files may be left out once they are packed into the markup cache
+        self.txt_files = find_markup_files(self.base_path)
+        self.frame_index = FrameIndex(self.image_files, self.txt_files)
+        self.markup_parser.open_cache(self.base_path)
+        self.frame_prefetcher.clear()
         
         if not self.image_files or not self.txt_files:
             messagebox.showerror("Error", "No images or markup files found in the selected folder")
             return
             
         self.current_index = 0
+        self.current_image = None
         self.reset_zoom()
         self.show_current_image()
         
     def get_frame_number(self, file_path):
         """Extracts frame number from filename"""
-        base_name = Path(file_path).stem
-        try:
-            return int(base_name)
-        except ValueError:
-            return None
+        return get_frame_number(file_path)
         
     def find_next_available_frame(self, current_frame_num, direction=1):
         """Finds next available frame number (forward or backward)"""
-        if not self.image_files:
-            return None
-            
-        # Get all frame numbers
-        frame_numbers = []
-        for file in self.image_files:
-            frame_num = self.get_frame_number(file)
-            if frame_num is not None:
-                frame_numbers.append((frame_num, file))
-                
-        if not frame_numbers:
-            return None
+        if direction > 0:  # Moving forward, to first frame if no frames ahead
+            return self.frame_index.next_frame(current_frame_num)
+        else:  # Moving backward, to last frame if no frames behind
+            return self.frame_index.prev_frame(current_frame_num)
+        
+    def find_markup_file(self, img_path):
+        """Finds markup file for the image: same name, or frame number without leading zeros. Returns None if missing"""
+        return self.frame_index.markup_file(img_path)
+        
+    def step_index(self, index, direction):
+        """Index of the image that next_image (direction=1) or prev_image (direction=-1) moves to from index"""
+        frame_num = self.get_frame_number(self.image_files[index])
+        if frame_num is not None:
+            return self.find_next_available_frame(frame_num, direction)[0]
+        return (index + direction) % len(self.image_files)
+        
+    def prefetch_neighbors(self):
+        """Starts background rendering of the frames around the current one, nearest first"""
+        neighbors = []
+        forward = backward = self.current_index
+        for _ in range(self.prefetch_count):
+            forward = self.step_index(forward, 1)
+            backward = self.step_index(backward, -1)
+            neighbors.extend([forward, backward])
             
-        # Sort by frame number
-        frame_numbers.sort(key=lambda x: x[0])
-        
-        if direction > 0:  # Moving forward
-            for num, file in frame_numbers:
-                if num > current_frame_num:
-                    return self.image_files.index(file), num
-            # If no frames ahead, return to first
-            first_num = frame_numbers[0][0] if frame_numbers else None
-            return 0, first_num
-        else:  # Moving backward
-            for num, file in reversed(frame_numbers):
-                if num < current_frame_num:
-                    return self.image_files.index(file), num
-            # If no frames behind, go to last
-            last_num = frame_numbers[-1][0] if frame_numbers else None
-            return len(self.image_files) - 1, last_num
-        
+        requests = []
+        for index in dict.fromkeys(neighbors):
+            if index != self.current_index:
+                img_path = self.image_files[index]
+                requests.append((img_path, self.find_markup_file(img_path)))
+        self.frame_prefetcher.prefetch(requests, self.zoom_factor)
+        
+    @profiler.timed('show')
     def show_current_image(self):
         """Displays current image with markup"""
+        self.render_scheduler.cancel("show")
         if not self.image_files or self.current_index >= len(self.image_files):
             return
             
-        # Load image
+        # Load image with markup, usually already prefetched
         img_path = self.image_files[self.current_index]
         self.current_image_path = img_path
-        img = self.image_processor.load_image(img_path)
-        if img is None:
+        base_name = Path(img_path).stem
+        txt_path = self.find_markup_file(img_path)
+        frame = self.frame_prefetcher.get(img_path, txt_path, self.zoom_factor)
+        if frame.image is None:
             messagebox.showerror("Error", f"Failed to load image: {img_path}")
             return
             
-        # Get base name for finding corresponding txt file
-        base_name = Path(img_path).stem
-        txt_path = None
-        txt_exists = True
-        
-        # Find matching txt file
-        for txt_file in self.txt_files:
-            if Path(txt_file).stem == base_name:
-                txt_path = txt_file
-                break
-                
-        if txt_path is None:
-            # If no exact match, try by frame number
-            try:
-                frame_number = int(base_name)
-                txt_path = os.path.join(self.base_path, f"{frame_number}.txt")
-                if not os.path.exists(txt_path):
-                    txt_exists = False
-                    messagebox.showwarning("Warning", f"No markup file found for {img_path}")
-                    # Display image without markup
-                    self.display_image_with_markup(img, [])
-            except ValueError:
-                txt_exists = False
-                messagebox.showwarning("Warning", f"No markup file found for {img_path}")
-                # Display image without markup
-                self.display_image_with_markup(img, [])
-                
+        txt_exists = txt_path is not None
+        if not txt_exists:
+            messagebox.showwarning("Warning", f"No markup file found for {img_path}")
+        elif frame.markup_error:
+            messagebox.showerror("Error", f"Error reading markup file: {frame.markup_error}")
+            
         self.current_txt_path = txt_path if txt_exists else "Markup file not found"
-                
-        # Load and parse markup
-        markup_data = []
-        if txt_exists and txt_path:
-            try:
-                markup_data = self.markup_parser.parse_markup_file(txt_path)
-            except Exception as e:
-                messagebox.showerror("Error", f"Error reading markup file: {e}")
             
         # Display image with markup
-        self.display_image_with_markup(img, markup_data)
+        self.display_image(frame.image, frame.full_size, frame.markup)
         
         # Get current frame number
         frame_number = self.get_frame_number(img_path) or base_name
         
-        # Get total number of frames (not just files)
-        frame_numbers = []
-        for file in self.image_files:
-            num = self.get_frame_number(file)
-            if num is not None:
-                frame_numbers.append(num)
-        
         # Update image counter - FIX: Show actual frame number instead of index
         if isinstance(frame_number, int):
             self.file_info.set(f"Frame: {frame_number}/{len(self.image_files)} (Image {self.current_index + 1}/{len(self.image_files)})")
@@ -284,23 +311,108 @@ class MarkupViewer:
         # Update file info in overlay
         img_name = os.path.basename(img_path)
         txt_info = os.path.basename(txt_path) if txt_exists else "Markup file not found"
-        self.overlay_text.set(f"Image: {img_name}\nMarkup: {txt_info}")
+        self.overlay_files = f"Image: {img_name}\nMarkup: {txt_info}"
+        self.update_overlay_text()
+        
+        profiler.count('frames')
+        self.prefetch_neighbors()
         
-    def display_image_with_markup(self, img, markup_data):
-        """Displays image with overlaid markup"""
-        # Save original image with markup
-        self.current_image = self.image_processor.apply_markup(img.copy(), markup_data)
+    def display_image(self, img, full_size=None, markup_data=None):
+        """Displays image with markup overlay. The image may be a reduced pyramid level of an image of full_size"""
+        self.set_base_image(img, full_size)
+        self.markup_overlay.draw(markup_data if markup_data is not None else [],
+                                 self.tile_renderer.full_size, self.zoom_factor)
         
         # Update display with current zoom
         self.update_display()
         
+    def set_base_image(self, img, full_size=None):
+        """Sets the image under the markup overlay"""
+        # Cached frames are shared, so drawing on the displayed image is not allowed
+        if img is not self.current_image:
+            # Tiles of the previous image would stay visible under the new markup until
+            # the new ones are resampled in the background
+            for item, _ in self.tile_items.values():
+                self.canvas.delete(item)
+            self.tile_items.clear()
+        self.current_image = img
+        self.current_level = ImagePyramid.level_for_scale(self.zoom_factor)
+        self.tile_renderer.set_image(img, full_size)
+        
     def update_display(self):
         """Updates display with current zoom factor"""
+        self.render_scheduler.cancel("display")
+        if self.current_image is None:
+            return
+            
+        # Zooming across a pyramid level boundary needs the image at another resolution
+        if ImagePyramid.level_for_scale(self.zoom_factor) != self.current_level:
+            self.reload_current_image()
+            return
+            
+        # Calculate new dimensions with zoom
+        new_width, new_height = self.tile_renderer.zoomed_size(self.zoom_factor)
+        
+        # Update scroll region
+        self.canvas.config(scrollregion=(0, 0, new_width, new_height))
+        
+        # Display visible part of the zoomed image in canvas, markup moves to the new zoom.
+        # Tile items and the file info overlay persist and are updated in place
+        self.render_visible_tiles()
+        self.markup_overlay.set_zoom(self.zoom_factor)
+        self.update_overlay_text()
+        
+        # Update zoom info
+        zoom_percentage = int(self.zoom_factor * 100)
+        self.zoom_info.set(f"Zoom: {zoom_percentage}%")
+        self.measure_redraw()
+        
+    def measure_redraw(self):
+        """Records the time until Tk is idle again, after drawing the changes, as the tk_redraw stage"""
+        if profiler.enabled:
+            start = time.perf_counter()
+            self.root.after_idle(lambda: profiler.record('tk_redraw', time.perf_counter() - start))
+            
+    def update_stats(self):
+        """Refreshes the profiling overlay"""
+        self.stats_text.set(profiler.format_summary())
+        self.stats_label.lift()
+        self.root.after(self.stats_interval, self.update_stats)
+        
+    def update_overlay_text(self):
+        """Shows file names in the overlay, and a notice when markup is too dense for vertex markers"""
+        text = self.overlay_files
+        if self.markup_overlay.hidden_markers:
+            text += (f"\nVertex markers hidden: {self.markup_overlay.hidden_markers} vertices "
+                     f"(over {self.markup_overlay.max_vertex_markers})")
+        self.overlay_text.set(text)
+        
+    def reload_current_image(self):
+        """Loads current image at the pyramid level of the current zoom in the background, without markup warnings"""
+        img_path, zoom = self.current_image_path, self.zoom_factor
+        txt_path = self.find_markup_file(img_path)
+        self.render_scheduler.run_async(
+            "reload",
+            lambda: self.frame_prefetcher.get(img_path, txt_path, zoom),
+            lambda frame: self.on_image_reloaded(img_path, zoom, frame),
+            self.on_render_failed)
+        
+    def on_image_reloaded(self, img_path, zoom, frame):
+        """Displays the reloaded image unless the image or pyramid level changed while it was loading"""
+        if frame.image is None or img_path != self.current_image_path:
+            return
+        if ImagePyramid.level_for_scale(zoom) != ImagePyramid.level_for_scale(self.zoom_factor):
+            return
+        self.set_base_image(frame.image, frame.full_size)
+        self.update_display()
+        self.prefetch_neighbors()
+        
+    def render_visible_tiles(self, high_quality=False):
+        """Shows tiles covering the visible canvas region. Fast tiles are replaced by high quality ones once input is idle"""
         if self.current_image is None:
             return
             
-        # Get image and canvas dimensions
-        img_height, img_width = self.current_image.shape[:2]
+        # Get canvas dimensions
         canvas_width = self.canvas.winfo_width()
         canvas_height = self.canvas.winfo_height()
         
@@ -310,44 +422,76 @@ class MarkupViewer:
         if canvas_height < 10:
             canvas_height = self.root.winfo_height() - 60
             
-        # Calculate new dimensions with zoom
-        new_width = int(img_width * self.zoom_factor)
-        new_height = int(img_height * self.zoom_factor)
-        
-        # Update scroll region
-        self.canvas.config(scrollregion=(0, 0, new_width, new_height))
-        
-        # Convert and display image
-        tk_img = self.image_processor.prepare_image_for_tkinter(
-            self.current_image, 
-            new_width, 
-            new_height
+        zoom = self.zoom_factor
+        layout = self.tile_renderer.tile_layout(
+            zoom,
+            self.canvas.canvasx(0),
+            self.canvas.canvasy(0),
+            canvas_width,
+            canvas_height
         )
-        self.tk_img = tk_img  # Keep reference to prevent garbage collection
         
-        # Display in canvas
-        self.canvas.delete("all")
-        self.canvas.create_image(0, 0, anchor=tk.NW, image=self.tk_img)
+        # Remove tiles that left the view, show cached ones right away. High quality tiles
+        # fall back to cached fast ones until they are ready
+        for key in list(self.tile_items):
+            if key not in layout:
+                self.canvas.delete(self.tile_items.pop(key)[0])
+        missing = []
+        for key, (x, y) in layout.items():
+            photo = self.tile_renderer.cached_tile(zoom, high_quality, key)
+            if photo is None:
+                missing.append(key)
+                photo = self.tile_renderer.cached_tile(zoom, False, key) if high_quality else None
+            if photo is not None:
+                self.show_tile(key, x, y, photo)
+                
+        # Resample the rest in the background; a newer render supersedes this one
+        if missing:
+            image, full_size = self.tile_renderer.image, self.tile_renderer.full_size
+            self.render_scheduler.run_async(
+                "tiles",
+                lambda: self.tile_renderer.resample_tiles(image, full_size, zoom, high_quality, missing),
+                lambda resampled: self.on_tiles_resampled(image, zoom, high_quality, resampled),
+                self.on_render_failed)
+            
+        if self.high_quality_job is not None:
+            self.root.after_cancel(self.high_quality_job)
+            self.high_quality_job = None
+        if not high_quality:
+            self.high_quality_job = self.root.after(
+                self.high_quality_delay, lambda: self.render_visible_tiles(high_quality=True))
+        
+    def on_render_failed(self, error):
+        """Reports an image load or tile render that failed in the background"""
+        messagebox.showerror("Error", f"Failed to render image: {error}")
+        
+    def on_tiles_resampled(self, image, zoom, high_quality, resampled):
+        """Shows tiles resampled in the background if they still belong to the displayed image and zoom"""
+        if image is not self.tile_renderer.image or zoom != self.zoom_factor:
+            return
+        size = self.tile_renderer.tile_size
+        for (col, row), photo in self.tile_renderer.add_tiles(zoom, high_quality, resampled).items():
+            self.show_tile((col, row), col * size, row * size, photo)
+        
+    def show_tile(self, key, x, y, photo):
+        """Updates or creates the canvas item of a tile"""
+        if key in self.tile_items:
+            item = self.tile_items[key][0]
+            self.canvas.itemconfig(item, image=photo)
+        else:
+            item = self.canvas.create_image(x, y, anchor=tk.NW, image=photo, tags="tile")
+            self.canvas.tag_lower(item)  # Keep below markup
+        self.tile_items[key] = (item, photo)  # Keep reference to prevent garbage collection
         
-        # Re-add overlay
-        self.overlay_frame = tk.Frame(self.canvas, bg='#333333')
-        self.overlay_frame.place(relx=0, rely=0, anchor='nw')
+    def scroll_x(self, *args):
+        """Horizontal scrollbar command"""
+        self.canvas.xview(*args)
+        self.render_visible_tiles()
         
-        self.overlay_label = tk.Label(
-            self.overlay_frame, 
-            textvariable=self.overlay_text, 
-            bg='#333333', 
-            fg='white', 
-            justify=tk.LEFT,
-            padx=10, 
-            pady=5,
-            anchor='w'
-        )
-        self.overlay_label.pack(fill=tk.X)
-        
-        # Update zoom info
-        zoom_percentage = int(self.zoom_factor * 100)
-        self.zoom_info.set(f"Zoom: {zoom_percentage}%")
+    def scroll_y(self, *args):
+        """Vertical scrollbar command"""
+        self.canvas.yview(*args)
+        self.render_visible_tiles()
         
     def next_image(self):
         """Switch to next image"""
@@ -373,7 +517,7 @@ class MarkupViewer:
             if self.current_index == 0:
                 messagebox.showinfo("Info", "End of list reached. Moving to first frame.")
             
-        self.show_current_image()
+        self.request_show_current_image()
         
     def prev_image(self):
         """Switch to previous image"""
@@ -400,7 +544,13 @@ class MarkupViewer:
             if was_at_start:
                 messagebox.showinfo("Info", "Start of list reached. Moving to last frame.")
             
-        self.show_current_image()
+        self.request_show_current_image()
+        
+    def request_show_current_image(self):
+        """Shows current image once navigation input settles, so holding an arrow key skips frames
+        instead of queueing a full redraw for each of them"""
+        self.file_info.set(f"Image: {self.current_index + 1}/{len(self.image_files)}")
+        self.render_scheduler.request("show", self.show_current_image, self.input_delay)
         
     def jump_to_image(self):
         """Jump to image by frame number"""
@@ -411,57 +561,47 @@ class MarkupViewer:
         if frame_number is None:
             return
             
-        # Find file with specified frame number
-        for i, file in enumerate(self.image_files):
-            if self.get_frame_number(file) == frame_number:
-                self.current_index = i
-                self.show_current_image()
-                return
-                
-        # If exact number not found, find nearest higher
-        next_frame = None
-        next_index = None
-        
-        for i, file in enumerate(sorted(self.image_files, key=lambda x: self.get_frame_number(x) or float('inf'))):
-            file_frame_num = self.get_frame_number(file)
-            if file_frame_num is not None and file_frame_num > frame_number:
-                next_frame = file_frame_num
-                next_index = self.image_files.index(file)
-                break
-                
-        if next_index is not None:
-            self.current_index = next_index
-            messagebox.showinfo("Info", f"Frame {frame_number} not found. Moving to frame {next_frame}.")
+        # Find file with specified frame number, or nearest higher
+        found = self.frame_index.find_frame(frame_number)
+        if found is not None:
+            self.current_index, found_frame = found
+            if found_frame != frame_number:
+                messagebox.showinfo("Info", f"Frame {frame_number} not found. Moving to frame {found_frame}.")
             self.show_current_image()
-        else:
-            # If no frames higher than requested, go to first
-            for i, file in enumerate(sorted(self.image_files, key=lambda x: self.get_frame_number(x) or float('inf'))):
-                file_frame_num = self.get_frame_number(file)
-                if file_frame_num is not None:
-                    self.current_index = self.image_files.index(file)
-                    messagebox.showinfo("Info", 
-                                       f"Frame {frame_number} and later frames not found. Moving to frame {file_frame_num}.")
-                    self.show_current_image()
-                    return
-                    
-            messagebox.showinfo("Info", "No files with numeric names found.")
+            return
+            
+        # If no frames higher than requested, go to first
+        first = self.frame_index.first_frame()
+        if first is not None:
+            self.current_index, first_frame = first
+            messagebox.showinfo("Info", 
+                               f"Frame {frame_number} and later frames not found. Moving to frame {first_frame}.")
+            self.show_current_image()
+            return
+            
+        messagebox.showinfo("Info", "No files with numeric names found.")
         
     def zoom_in(self):
         """Increase zoom level"""
         self.zoom_factor += self.zoom_step
-        self.update_display()
+        self.request_update_display()
         
     def zoom_out(self):
         """Decrease zoom level"""
         if self.zoom_factor > self.zoom_step:
             self.zoom_factor -= self.zoom_step
-            self.update_display()
+            self.request_update_display()
         
     def reset_zoom(self):
         """Reset zoom to 100%"""
         self.zoom_factor = 1.0
         if self.current_image is not None:
             self.update_display()
+            
+    def request_update_display(self):
+        """Updates display once zoom input settles: a fast wheel spin is one redraw at the final zoom"""
+        self.zoom_info.set(f"Zoom: {int(self.zoom_factor * 100)}%")
+        self.render_scheduler.request("display", self.update_display, self.input_delay)
         
     def start_pan(self, event):
         """Start panning operation"""
@@ -486,6 +626,8 @@ class MarkupViewer:
         self.start_x = event.x
         self.start_y = event.y
         
+        self.render_visible_tiles()
+        
     def stop_pan(self, event):
         """End panning operation"""
         self.panning = False
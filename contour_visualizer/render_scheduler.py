@@ -0,0 +1,83 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+class RenderScheduler:
+    """Coalesces bursts of UI events and runs heavy work off the Tk main thread.
+
+    request() debounces a callback: a burst of requests with the same name runs it once, after the
+    burst settles. run_async() runs work on a background thread and hands its result to a callback
+    on the Tk thread; a newer run with the same name supersedes older ones, whose results are dropped.
+    Exceptions of the work are handed to an error callback on the Tk thread the same way"""
+    def __init__(self, root, delay=30, poll_interval=10):
+        self.root = root
+        self.delay = delay  # ms
+        self.poll_interval = poll_interval  # ms
+        self.jobs = {}  # name -> (pending after() id, callback)
+        self.generations = {}  # name -> number of the latest run_async
+        self.futures = {}  # name -> Future of the latest run_async
+        self.results = queue.Queue()  # (name, generation, callback, result or exception) from worker threads
+        self.polling = False
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
+
+    def request(self, name, callback, delay=None):
+        """Runs callback on the Tk thread once no request with this name came for delay ms"""
+        self.cancel(name)
+        job = self.root.after(self.delay if delay is None else delay, lambda: self._run(name, callback))
+        self.jobs[name] = (job, callback)
+
+    def _run(self, name, callback):
+        self.jobs.pop(name, None)
+        callback()
+
+    def cancel(self, name):
+        """Cancels a pending debounced request"""
+        job = self.jobs.pop(name, None)
+        if job is not None:
+            self.root.after_cancel(job[0])
+
+    def flush(self):
+        """Runs all pending debounced requests now"""
+        for name in list(self.jobs):
+            job = self.jobs.get(name)
+            if job is not None:
+                self.root.after_cancel(job[0])
+                self._run(name, job[1])
+
+    def run_async(self, name, work, on_done, on_error=None):
+        """Runs work() on a background thread and on_done(result) on the Tk thread, unless superseded.
+        If work raises, on_error(exception) runs instead; without on_error the exception goes to Tk's
+        report_callback_exception, like errors of any other Tk callback"""
+        generation = self.generations.get(name, 0) + 1
+        self.generations[name] = generation
+        previous = self.futures.get(name)
+        if previous is not None:
+            previous.cancel()
+
+        def task():
+            # Tk is not thread safe, so results are passed through a queue polled on the Tk thread
+            try:
+                self.results.put((name, generation, on_done, work()))
+            except Exception as e:
+                self.results.put((name, generation, on_error or self._report, e))
+
+        self.futures[name] = self.executor.submit(task)
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.poll_interval, self._poll)
+
+    def _report(self, error):
+        self.root.report_callback_exception(type(error), error, error.__traceback__)
+
+    def _poll(self):
+        while True:
+            try:
+                name, generation, on_done, result = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if self.generations.get(name) == generation:
+                on_done(result)
+
+        if any(not future.done() for future in self.futures.values()) or not self.results.empty():
+            self.root.after(self.poll_interval, self._poll)
+        else:
+            self.polling = False
@@ -0,0 +1,86 @@
+import math
+from collections import OrderedDict
+
+import cv2
+from PIL import Image, ImageTk
+
+from common.profiler import profiler
+
+class TileRenderer:
+    """Resamples only the tiles of the zoomed image that cover the visible canvas region.
+    Tiles are cached per zoom level and quality, so panning and returning to a zoom level reuse them"""
+    def __init__(self, tile_size=512, max_tiles=128):
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+        self.image = None
+        self.full_size = None
+        # (zoom, high quality, tile column, tile row) -> PhotoImage, least recently used first
+        self.tiles = OrderedDict()
+
+    def set_image(self, cv_img, full_size=None):
+        """Sets the OpenCV image to render from and drops tiles of the previous one. The image may be
+        a reduced pyramid level of a full image of full_size (width, height); zoom is relative to full_size"""
+        self.tiles.clear()
+        if cv_img is None:
+            self.image = None
+            return
+        # Convert from BGR to RGB (Pillow uses RGB)
+        self.image = Image.fromarray(cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB))
+        self.full_size = full_size or self.image.size
+
+    def zoomed_size(self, zoom):
+        """Size of the whole image at the given zoom"""
+        return int(self.full_size[0] * zoom), int(self.full_size[1] * zoom)
+
+    def tile_layout(self, zoom, view_x, view_y, view_width, view_height, margin=None):
+        """Returns {(column, row): (x, y)} of tiles covering the view rectangle (in zoomed image
+        coordinates) plus a margin"""
+        if self.image is None:
+            return {}
+        margin = self.tile_size // 2 if margin is None else margin
+        zoomed_width, zoomed_height = self.zoomed_size(zoom)
+        size = self.tile_size
+
+        first_col = max(int((view_x - margin) // size), 0)
+        first_row = max(int((view_y - margin) // size), 0)
+        last_col = min(int(math.ceil((view_x + view_width + margin) / size)), int(math.ceil(zoomed_width / size)))
+        last_row = min(int(math.ceil((view_y + view_height + margin) / size)), int(math.ceil(zoomed_height / size)))
+
+        return {(col, row): (col * size, row * size)
+                for row in range(first_row, last_row) for col in range(first_col, last_col)}
+
+    def cached_tile(self, zoom, high_quality, key):
+        """PhotoImage of the tile (column, row) if it is cached, otherwise None"""
+        cache_key = (round(zoom, 6), high_quality) + tuple(key)
+        tile = self.tiles.get(cache_key)
+        if tile is not None:
+            self.tiles.move_to_end(cache_key)
+        return tile
+
+    @profiler.timed('resample')
+    def resample_tiles(self, image, full_size, zoom, high_quality, keys):
+        """Returns {(column, row): PIL image} of the given tiles of image (as set by set_image).
+        Only uses its arguments, so it can run on a worker thread while the Tk thread keeps going"""
+        zoomed_width, zoomed_height = int(full_size[0] * zoom), int(full_size[1] * zoom)
+        scale_x = image.width / zoomed_width
+        scale_y = image.height / zoomed_height
+        resample = Image.LANCZOS if high_quality else Image.BILINEAR
+        result = {}
+        for col, row in keys:
+            x0, y0 = col * self.tile_size, row * self.tile_size
+            x1 = min(x0 + self.tile_size, zoomed_width)
+            y1 = min(y0 + self.tile_size, zoomed_height)
+            box = (x0 * scale_x, y0 * scale_y, x1 * scale_x, y1 * scale_y)
+            result[(col, row)] = image.resize((x1 - x0, y1 - y0), resample, box=box)
+        return result
+
+    @profiler.timed('prepare_tk')
+    def add_tiles(self, zoom, high_quality, resampled):
+        """Caches tiles returned by resample_tiles and returns {(column, row): PhotoImage}.
+        PhotoImages are Tk objects, so this must run on the Tk thread"""
+        photos = {}
+        for (col, row), tile in resampled.items():
+            photos[(col, row)] = self.tiles[(round(zoom, 6), high_quality, col, row)] = ImageTk.PhotoImage(tile)
+        while len(self.tiles) > self.max_tiles:
+            self.tiles.popitem(last=False)
+        return photos
@@ -1,10 +1,21 @@
+import argparse
 import tkinter as tk
 from markup_viewer import MarkupViewer
+from common.profiler import profiler
 
 def main():
+    parser = argparse.ArgumentParser(description='Browse images with their YOLO contour markup.')
+    parser.add_argument('--profile', metavar='PATH', help='Show live stage timings and write them to a .json or .csv file at exit')
+    parser.add_argument('--save-levels', action='store_true',
+                        help='Save downscaled levels decoded while zoomed out to a .pyramid folder next to the images')
+    args = parser.parse_args()
+    if args.profile:
+        profiler.enable(args.profile)
+    
     root = tk.Tk()
     app = MarkupViewer(root)
+    app.image_processor.pyramid.write_levels = args.save_levels
     root.mainloop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
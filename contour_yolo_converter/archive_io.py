@@ -0,0 +1,205 @@
+import io
+import os
+import time
+import shutil
+import tarfile
+import zipfile
+import posixpath
+from pathlib import Path
+
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+def is_archive_path(path):
+    """Check whether path names a zip or tar archive by its suffix."""
+    return str(path).lower().endswith(ARCHIVE_SUFFIXES)
+
+def strip_archive_suffix(path):
+    """Return path without its archive suffix (e.g. export.tar.gz -> export)."""
+    path = str(path)
+    for suffix in sorted(ARCHIVE_SUFFIXES, key=len, reverse=True):
+        if path.lower().endswith(suffix):
+            return path[:-len(suffix)]
+    return path
+
+class ArchiveReader:
+    """Read-only access to the file members of a zip or tar archive, without extracting it.
+
+    A zip archive is indexed from its central directory. A tar archive has no index, so its member
+    headers are scanned once up front, which decompresses a compressed tar completely; members for which
+    preload(name) is true are read into memory during that scan, so small files needed before the data
+    pass (e.g. obj.data) don't make the reader seek back. Other members should be read in archive order."""
+
+    def __init__(self, path, preload=None):
+        self.path = str(path)
+        self._zip = None
+        self._tar = None
+        self._preloaded = {}
+        if zipfile.is_zipfile(self.path):
+            self._zip = zipfile.ZipFile(self.path)
+            infos = [info for info in self._zip.infolist() if not info.is_dir()]
+            self._members = {self._normalize(info.filename): info for info in infos}
+            self._offsets = {self._normalize(info.filename): info.header_offset for info in infos}
+        else:
+            # Scans member headers once; data is read later in archive order
+            self._tar = tarfile.open(self.path, 'r:*')
+            members = []
+            for member in self._tar:
+                if not member.isfile():
+                    continue
+                members.append(member)
+                if preload is not None and preload(self._normalize(member.name)):
+                    # The data follows the header just read, so this doesn't seek back
+                    with self._tar.extractfile(member) as f:
+                        self._preloaded[self._normalize(member.name)] = f.read()
+            self._members = {self._normalize(member.name): member for member in members}
+            self._offsets = {self._normalize(member.name): member.offset_data for member in members}
+
+    @staticmethod
+    def _normalize(name):
+        while name.startswith('./'):
+            name = name[2:]
+        return name
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+        if self._tar is not None:
+            self._tar.close()
+
+    def exists(self, name):
+        return name in self._members
+
+    def find(self, basename):
+        """Return the shallowest member whose file name is basename, or None."""
+        matches = [name for name in self._members if posixpath.basename(name) == basename]
+        return min(matches, key=lambda name: (name.count('/'), name)) if matches else None
+
+    def size(self, name):
+        member = self._members[name]
+        return member.file_size if self._zip is not None else member.size
+
+    def open(self, name):
+        """Open a member as a binary file object."""
+        if name in self._preloaded:
+            return io.BytesIO(self._preloaded[name])
+        if self._zip is not None:
+            return self._zip.open(self._members[name])
+        return self._tar.extractfile(self._members[name])
+
+    def read_text(self, name):
+        with self.open(name) as f:
+            return f.read().decode('utf-8')
+
+    def in_archive_order(self, names):
+        """Sort member names by their position in the archive so that reading them never seeks backwards."""
+        return sorted(names, key=self._offsets.__getitem__)
+
+class DirectoryWriter:
+    """Writes output files below a directory."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        pass
+
+    def _path(self, name):
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def write_text(self, name, text):
+        with open(self._path(name), 'w') as f:
+            f.write(text)
+
+    def write_stream(self, name, fileobj, size):
+        with open(self._path(name), 'wb') as f:
+            shutil.copyfileobj(fileobj, f)
+
+    def write_copy(self, name, source_name):
+        """Write a copy of the already written file source_name, as a hard link where possible."""
+        path = self._path(name)
+        if path.exists():
+            path.unlink()
+        try:
+            os.link(self.root / source_name, path)
+        except OSError:
+            shutil.copyfile(self.root / source_name, path)
+
+class ZipWriter(DirectoryWriter):
+    """Writes output files into a zip archive. Images are stored uncompressed since they are already compressed."""
+
+    def __init__(self, path):
+        self._zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_STORED, allowZip64=True)
+
+    def close(self):
+        self._zip.close()
+
+    def write_text(self, name, text):
+        self._zip.writestr(name, text, compress_type=zipfile.ZIP_DEFLATED)
+
+    def write_stream(self, name, fileobj, size):
+        with self._zip.open(name, 'w', force_zip64=size >= zipfile.ZIP64_LIMIT) as f:
+            shutil.copyfileobj(fileobj, f)
+
+    def write_copy(self, name, source_name):
+        """Zip has no links: the member is read back from the archive and stored again."""
+        data = self._zip.read(source_name)
+        self.write_stream(name, io.BytesIO(data), len(data))
+
+class TarWriter(DirectoryWriter):
+    """Writes output files into a tar archive, compressed according to its suffix."""
+
+    def __init__(self, path):
+        lower = str(path).lower()
+        if lower.endswith(('.tar.gz', '.tgz')):
+            mode = 'w:gz'
+        elif lower.endswith(('.tar.bz2', '.tbz2')):
+            mode = 'w:bz2'
+        elif lower.endswith(('.tar.xz', '.txz')):
+            mode = 'w:xz'
+        else:
+            mode = 'w'
+        self._tar = tarfile.open(path, mode)
+
+    def close(self):
+        self._tar.close()
+
+    def write_text(self, name, text):
+        data = text.encode('utf-8')
+        self.write_stream(name, io.BytesIO(data), len(data))
+
+    def write_stream(self, name, fileobj, size):
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = int(time.time())
+        self._tar.addfile(info, fileobj)
+
+    def write_copy(self, name, source_name):
+        """Add a hard link member pointing at source_name, so the data is stored once."""
+        info = tarfile.TarInfo(name)
+        info.type = tarfile.LNKTYPE
+        info.linkname = source_name
+        info.mtime = int(time.time())
+        self._tar.addfile(info)
+
+def open_writer(output):
+    """Return a writer for output: an archive writer if output has an archive suffix, otherwise a directory writer."""
+    if str(output).lower().endswith('.zip'):
+        return ZipWriter(output)
+    if is_archive_path(output):
+        return TarWriter(output)
+    return DirectoryWriter(output)
@@ -0,0 +1,59 @@
+import os
+import shutil
+import argparse
+import tempfile
+import time
+from collections import Counter
+
+from converter import LINK_MODES, materialize_image
+
+def make_source_files(source_dir, count, size):
+    """Create count random files of size bytes to act as source images."""
+    os.makedirs(source_dir, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = os.path.join(source_dir, f"{i:06d}.jpg")
+        with open(path, 'wb') as f:
+            f.write(os.urandom(size))
+        paths.append(path)
+    return paths
+
+def benchmark_mode(paths, target_dir, link_mode):
+    """Materialize all paths into target_dir. Returns (seconds, bytes written to disk, modes used)."""
+    os.makedirs(target_dir, exist_ok=True)
+    used_before = shutil.disk_usage(target_dir).used
+    modes_used = Counter()
+    start = time.perf_counter()
+    for path in paths:
+        modes_used[materialize_image(path, os.path.join(target_dir, os.path.basename(path)), link_mode)] += 1
+    os.sync()
+    elapsed = time.perf_counter() - start
+    bytes_written = max(0, shutil.disk_usage(target_dir).used - used_before)
+    return elapsed, bytes_written, modes_used
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare wall time and disk usage of converter link modes.')
+    parser.add_argument('--source_dir', type=str, default=None, help='Directory with images to use (defaults to generated files)')
+    parser.add_argument('--work_dir', type=str, default=None, help='Directory for benchmark output (defaults to a temp dir)')
+    parser.add_argument('--count', type=int, default=500, help='Number of generated files')
+    parser.add_argument('--size', type=int, default=1 << 20, help='Size of each generated file in bytes')
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='link_bench_')
+    if args.source_dir:
+        paths = sorted(os.path.join(args.source_dir, name) for name in os.listdir(args.source_dir)
+                       if os.path.isfile(os.path.join(args.source_dir, name)))
+    else:
+        paths = make_source_files(os.path.join(work_dir, 'source'), args.count, args.size)
+    total_bytes = sum(os.path.getsize(p) for p in paths)
+    print(f"{len(paths)} files, {total_bytes / 2**20:.1f} MiB")
+
+    for link_mode in LINK_MODES:
+        target_dir = os.path.join(work_dir, link_mode)
+        elapsed, bytes_written, modes_used = benchmark_mode(paths, target_dir, link_mode)
+        used = ", ".join(f"{mode}={n}" for mode, n in sorted(modes_used.items()))
+        print(f"{link_mode:>8}: {elapsed:8.3f} s  {bytes_written / 2**20:10.1f} MiB written  ({used})")
+        shutil.rmtree(target_dir)
+
+    if not args.work_dir:
+        shutil.rmtree(work_dir)
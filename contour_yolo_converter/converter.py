@@ -1,42 +1,164 @@
+import io
 import os
+import errno
 import shutil
 import yaml
+import numpy as np
 import argparse
+import posixpath
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-def convert_annotation(input_path, output_path):
-    """Convert polygon annotation to YOLO bounding box format."""
-    with open(input_path, 'r') as infile, open(output_path, 'w') as outfile:
-        for line in infile:
-            parts = line.strip().split()
+from manifest import file_info, same_content, load_manifest, save_manifest, prune_outputs
+from archive_io import ArchiveReader, is_archive_path, strip_archive_suffix, open_writer
+from splitter import assign_splits, parse_ratios, DEFAULT_RATIOS, GROUP_MODES, DEFAULT_GROUP_FRAMES
+from label_stats import scan_labels, label_text_stats
+from common.profiler import profiler, init_worker
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+try:
+    from PIL import Image
+except ImportError:  # only needed to read image sizes for --simplify
+    Image = None
+
+try:
+    from common.geometry import simplify_polygon
+except ImportError:  # OpenCV is only needed for --simplify
+    simplify_polygon = None
+
+LINK_MODES = ['copy', 'hardlink', 'symlink', 'reflink']
+LABEL_FORMATS = ['bbox', 'seg', 'both']
+SEGMENT_DIR = 'segment'  # dataset with segmentation labels, sharing the images of the main one
+FICLONE = 0x40049409  # Linux ioctl for copy-on-write file clones (btrfs, xfs)
+
+def convert_annotation(input_path, output_path, segment_path=None, image_size=None, tolerance=0):
+    """Convert polygon annotation to YOLO bounding box format. With segment_path, the polygons are also
+    written in YOLO segmentation format, simplified with tolerance pixels of an image of image_size.
+    The input is read once; output_path may be None to write only the segmentation labels."""
+    if segment_path is None:
+        convert_annotations_batch([(input_path, output_path)])
+        return
+    class_ids, coords, offsets, _ = load_polygon_buffer([input_path])
+    if output_path is not None:
+        with open(output_path, 'w') as outfile:
+            outfile.write(format_bboxes(class_ids, polygons_to_bboxes(coords, offsets)))
+    with open(segment_path, 'w') as outfile:
+        outfile.write(format_segments(class_ids, simplify_polygons(coords, offsets, image_size, tolerance)))
+
+def load_polygon_buffer(label_paths):
+    """Read label files into one flat coordinate buffer.
+
+    Returns (class_ids, coords, offsets, file_offsets):
+    class_ids - class id string of every polygon,
+    coords - float64 array [x0, y0, x1, y1, ...] of all polygons back to back,
+    offsets - start of every polygon in coords (plus the total length at the end),
+    file_offsets - index of the first polygon of every file (plus the polygon count at the end).
+    """
+    return polygon_buffer_from_lines(_read_lines(path) for path in label_paths)
+
+def _read_lines(path):
+    with open(path, 'r') as infile:
+        yield from infile
+
+def polygon_buffer_from_lines(label_lines):
+    """Same as load_polygon_buffer, but takes one iterable of text lines per label file."""
+    class_ids = []
+    values = []
+    offsets = [0]
+    file_offsets = [0]
+    for lines in label_lines:
+        for line in lines:
+            parts = line.split()
             if len(parts) < 3 or len(parts) % 2 == 0:
                 continue  # skip malformed lines
-            class_id = parts[0]
-            coords = list(map(float, parts[1:]))
-            x_coords = coords[::2]
-            y_coords = coords[1::2]
-            x_min = min(x_coords)
-            x_max = max(x_coords)
-            y_min = min(y_coords)
-            y_max = max(y_coords)
-            x_center = (x_min + x_max) / 2
-            y_center = (y_min + y_max) / 2
-            width = x_max - x_min
-            height = y_max - y_min
-            outfile.write(f"{class_id} {x_center:.6f} {y_center:.6f} {width:.6f} {height:.6f}\n")
+            class_ids.append(parts[0])
+            values.extend(map(float, parts[1:]))
+            offsets.append(len(values))
+        file_offsets.append(len(class_ids))
+    coords = np.array(values, dtype=np.float64)
+    return class_ids, coords, np.array(offsets, dtype=np.int64), np.array(file_offsets, dtype=np.int64)
+
+def polygons_to_bboxes(coords, offsets):
+    """Compute (N, 4) array of [x_center, y_center, width, height] for polygons in a flat buffer."""
+    if len(offsets) < 2:
+        return np.empty((0, 4), dtype=np.float64)
+    xs = coords[0::2]
+    ys = coords[1::2]
+    starts = offsets[:-1] // 2
+    x_min = np.minimum.reduceat(xs, starts)
+    x_max = np.maximum.reduceat(xs, starts)
+    y_min = np.minimum.reduceat(ys, starts)
+    y_max = np.maximum.reduceat(ys, starts)
+    return np.stack([(x_min + x_max) / 2, (y_min + y_max) / 2, x_max - x_min, y_max - y_min], axis=1)
+
+def format_bboxes(class_ids, bboxes):
+    """Format bounding boxes as YOLO label text."""
+    return "".join(f"{class_id} {x:.6f} {y:.6f} {w:.6f} {h:.6f}\n"
+                   for class_id, (x, y, w, h) in zip(class_ids, bboxes.tolist()))
+
+def convert_annotations_batch(path_pairs):
+    """Convert many polygon annotations at once. path_pairs is a list of (input_path, output_path)."""
+    path_pairs = list(path_pairs)
+    class_ids, coords, offsets, file_offsets = load_polygon_buffer(p for p, _ in path_pairs)
+    bboxes = polygons_to_bboxes(coords, offsets)
+    for i, (_, output_path) in enumerate(path_pairs):
+        start, end = file_offsets[i], file_offsets[i + 1]
+        with open(output_path, 'w') as outfile:
+            outfile.write(format_bboxes(class_ids[start:end], bboxes[start:end]))
+
+def convert_annotation_text(text):
+    """Convert polygon annotation text to YOLO bounding box label text."""
+    class_ids, coords, offsets, _ = polygon_buffer_from_lines([text.splitlines()])
+    return format_bboxes(class_ids, polygons_to_bboxes(coords, offsets))
+
+def segment_annotation_text(text, image_size=None, tolerance=0):
+    """Convert polygon annotation text to YOLO segmentation label text, see simplify_polygons."""
+    class_ids, coords, offsets, _ = polygon_buffer_from_lines([text.splitlines()])
+    return format_segments(class_ids, simplify_polygons(coords, offsets, image_size, tolerance))
+
+def simplify_polygons(coords, offsets, image_size=None, tolerance=0):
+    """List of flat normalized coordinate arrays of the polygons in a flat buffer, simplified with
+    a tolerance in pixels of an image of image_size (width, height). No simplification without them."""
+    polygons = [coords[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+    if not tolerance or image_size is None:
+        return polygons
+    if simplify_polygon is None:
+        raise RuntimeError("OpenCV is required to simplify polygons")
+    scale = np.array(image_size, dtype=np.float64)
+    return [(simplify_polygon(polygon.reshape(-1, 2) * scale, tolerance) / scale).ravel() for polygon in polygons]
+
+def format_segments(class_ids, segments):
+    """Format polygons as YOLO segmentation label text: class id and normalized x y of every vertex."""
+    return "".join(f"{class_id} " + " ".join(f"{v:.6f}" for v in segment.tolist()) + "\n"
+                   for class_id, segment in zip(class_ids, segments))
+
+def read_image_size(fileobj):
+    """(width, height) from the image header, fileobj is a path or a binary file object."""
+    if Image is None:
+        raise RuntimeError("Pillow is required to simplify polygons in pixels")
+    with Image.open(fileobj) as img:
+        return img.size
 
 def parse_obj_data(obj_data_path):
     """Read obj.data and clean paths by removing 'data/' prefix where needed."""
-    data = {}
     with open(obj_data_path, 'r') as f:
-        for line in f:
-            if '=' in line:
-                key, value = line.strip().split('=', 1)
-                key = key.strip()
-                value = value.strip()
-                if key in ["train", "names", "backup"] and value.startswith("data/"):
-                    value = value[len("data/"):]
-                data[key] = value
+        return parse_obj_data_lines(f)
+
+def parse_obj_data_lines(lines):
+    """Parse obj.data lines, see parse_obj_data."""
+    data = {}
+    for line in lines:
+        if '=' in line:
+            key, value = line.strip().split('=', 1)
+            key = key.strip()
+            value = value.strip()
+            if key in ["train", "names", "backup"] and value.startswith("data/"):
+                value = value[len("data/"):]
+            data[key] = value
     return data
 
 def read_class_names(names_path):
@@ -45,52 +167,433 @@ def read_class_names(names_path):
         lines = f.readlines()
     return [line.strip() for line in lines if line.strip()]
 
-def generate_data_yaml(output_dir, class_names):
+def parse_image_list(lines):
+    """Parse train list lines into image paths relative to the data folder."""
+    image_paths = [line.strip() for line in lines if line.strip()]
+    return [line[len("data/"):] if line.startswith("data/") else line for line in image_paths]
+
+def split_image_paths(image_paths, split_options=None, image_classes=None):
+    """Split image paths into [(split, img_path), ...], see splitter.assign_splits.
+    split_options holds its ratios, seed, group_by and group_frames arguments."""
+    return assign_splits(image_paths, image_classes=image_classes, **(split_options or {}))
+
+def label_name_for(img_path):
+    """Name of the label file of an image."""
+    return os.path.splitext(os.path.basename(img_path))[0] + '.txt'
+
+def label_dirs(label_options):
+    """(bbox label folder, segmentation label folder) of the output, None for labels that are not written.
+    label_options['format'] is one of LABEL_FORMATS (default: bbox); label_options['simplify'] needs
+    segmentation labels and raises ValueError with bbox."""
+    label_options = label_options or {}
+    label_format = label_options.get('format') or 'bbox'
+    if label_format == 'bbox' and label_options.get('simplify') is not None:
+        raise ValueError("simplify applies to segmentation labels, use format seg or both")
+    return {'bbox': ('labels', None),
+            'seg': (None, 'labels'),
+            'both': ('labels', f'{SEGMENT_DIR}/labels')}[label_format]
+
+def data_yaml_text(output_dir, class_names, splits=('train', 'val')):
+    """Build data.yaml contents for YOLO training with class names and image paths."""
+    data_yaml = {'path': str(output_dir)}
+    for split in splits:
+        data_yaml[split] = f'images/{split}'
+    data_yaml['names'] = {i: name for i, name in enumerate(class_names)}
+    return yaml.dump(data_yaml, default_flow_style=False, allow_unicode=True)
+
+def generate_data_yaml(output_dir, class_names, splits=('train', 'val')):
     """Generate data.yaml file for YOLO training with class names and image paths."""
-    data_yaml = {
-        'path': str(output_dir),
-        'train': 'images/train',
-        'val': 'images/val',
-        'names': {i: name for i, name in enumerate(class_names)}
-    }
     with open(os.path.join(output_dir, 'data.yaml'), 'w') as f:
-        yaml.dump(data_yaml, f, default_flow_style=False, allow_unicode=True)
+        f.write(data_yaml_text(output_dir, class_names, splits))
 
-if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description='Convert annotation format to YOLO-compatible structure.')
-    parser.add_argument('input_dir', type=str, help='Path to directory containing the "data" folder with obj.data, obj.names, etc.')
-    parser.add_argument('--output_dir', type=str, default=None, help='Path to output directory (defaults to <input_dir>_converted)')
-    args = parser.parse_args()
+def _reflink(src, dst):
+    """Clone src into dst sharing the same data blocks. Raises OSError when unsupported."""
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflink is not supported on this platform")
+    with open(src, 'rb') as infile, open(dst, 'wb') as outfile:
+        fcntl.ioctl(outfile.fileno(), FICLONE, infile.fileno())
 
-    input_root = Path(args.input_dir)
-    output_root = Path(args.output_dir) if args.output_dir else Path(str(input_root) + '_converted')
+def materialize_image(src, dst, link_mode='copy'):
+    """Place src at dst using the requested link mode, falling back to a plain copy
+    when the link cannot be made (e.g. across filesystems). Returns the mode actually used."""
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        if link_mode == 'hardlink':
+            os.link(src, dst)
+            return 'hardlink'
+        if link_mode == 'symlink':
+            os.symlink(os.path.abspath(src), dst)
+            return 'symlink'
+        if link_mode == 'reflink':
+            _reflink(src, dst)
+            return 'reflink'
+    except OSError:
+        if os.path.lexists(dst):
+            os.remove(dst)
+    shutil.copy(src, dst)
+    return 'copy'
+
+def process_image(task):
+    """Copy one image and convert its annotation unless the manifest record shows them unchanged.
+    Returns (img_path, error, record, updated) where error is None on success."""
+    with profiler.stage('item'):
+        return _process_image(task)
+
+def process_image_in_worker(task):
+    """process_image in a pool worker, adding the timings recorded in the worker (None unless profiling)
+    for the parent to merge."""
+    return process_image(task) + (profiler.collect(),)
+
+def _process_image(task):
+    data_dir, output_root, split, img_path, link_mode, previous, label_options = task
+    try:
+        img_name = os.path.basename(img_path)
+        label_name = label_name_for(img_name)
+        image_output = os.path.join('images', split, img_name)
+        label_options = label_options or {}
+        tolerance = label_options.get('simplify')
+        bbox_dir, segment_dir = label_dirs(label_options)
+        label_output = os.path.join(bbox_dir, split, label_name) if bbox_dir else None
+        segment_output = os.path.join(segment_dir, split, label_name) if segment_dir else None
+
+        input_annotation_path = data_dir / 'obj_train_data' / label_name
+        previous = previous or {}
+        with profiler.stage('hash'):
+            image_info = file_info(data_dir / img_path, previous.get('image'))
+            label_info = None
+            if input_annotation_path.exists():
+                label_info = file_info(input_annotation_path, previous.get('label'))
+
+        outputs = [image_output]
+        if label_info:
+            outputs += [output for output in (label_output, segment_output) if output]
+        record = {'image': image_info, 'label': label_info, 'link_mode': link_mode, 'outputs': outputs,
+                  'label_options': label_options}
+
+        if (previous.get('link_mode') == link_mode
+                and previous.get('label_options', {}) == label_options
+                and same_content(previous.get('image'), image_info)
+                and same_content(previous.get('label'), label_info)
+                and all(os.path.lexists(output_root / output) for output in outputs)):
+            return img_path, None, record, False
+
+        with profiler.stage('materialize'):
+            materialize_image(data_dir / img_path, output_root / image_output, link_mode)
+        profiler.count('images')
+        profiler.count_file(data_dir / img_path)
+
+        if label_info:
+            with profiler.stage('convert'):
+                image_size = read_image_size(data_dir / img_path) if tolerance and segment_output else None
+                convert_annotation(input_annotation_path, output_root / label_output if label_output else None,
+                                   output_root / segment_output if segment_output else None, image_size, tolerance)
+            profiler.count_file(input_annotation_path)
+        else:
+            for output in (label_output, segment_output):
+                if output and os.path.exists(output_root / output):
+                    os.remove(output_root / output)  # source label was deleted
+        # Outputs of the previous build that this one doesn't produce, e.g. after changing options
+        for output in set(previous.get('outputs', [])) - set(outputs):
+            if os.path.lexists(output_root / output):
+                os.remove(output_root / output)
+        return img_path, None, record, True
+    except Exception as e:
+        return img_path, str(e), None, False
+
+def run_tasks(tasks, workers=1):
+    """Run process_image over all tasks, serially or across a process pool, printing progress.
+    Returns (records, errors, updated): manifest records of successful tasks in task order,
+    (img_path, error) pairs for files that failed and the number of items that were rebuilt."""
+    total = len(tasks)
+    records = []
+    errors = []
+    updated_count = 0
+    report_every = max(1, total // 100)
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(profiler.enabled,))
+        chunksize = max(1, min(64, total // (workers * 4)))
+        results = executor.map(process_image_in_worker, tasks, chunksize=chunksize)
+    else:
+        # Timings are recorded straight into this process's profiler
+        executor = None
+        results = (process_image(task) + (None,) for task in tasks)
+    try:
+        for done, (img_path, error, record, updated, profile) in enumerate(results, 1):
+            profiler.merge(profile)
+            records.append(record)
+            updated_count += updated
+            if error is not None:
+                errors.append((img_path, error))
+                print(f"\nSkipped: {img_path} ({error})")
+            if done % report_every == 0 or done == total:
+                print(f"\rProcessed {done}/{total}", end='', flush=True)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    if total:
+        print()
+    return records, errors, updated_count
+
+def split_names(split_options):
+    """Names of the splits that get images."""
+    ratios = (split_options or {}).get('ratios') or DEFAULT_RATIOS
+    return [name for name, ratio in ratios.items() if ratio > 0]
+
+def link_segment_images(output_root, splits):
+    """Point segment/images/<split> at images/<split>. Where directory symlinks are not possible
+    the folder is filled with hard links (or copies) of the images instead."""
+    for split in splits:
+        link = output_root / SEGMENT_DIR / 'images' / split
+        target = output_root / 'images' / split
+        link.parent.mkdir(parents=True, exist_ok=True)
+        if not os.path.lexists(link):
+            try:
+                os.symlink(os.path.join('..', '..', 'images', split), link, target_is_directory=True)
+                continue
+            except OSError:
+                link.mkdir()
+        if os.path.islink(link):
+            continue
+        names = set(os.listdir(target))
+        for name in set(os.listdir(link)) - names:
+            os.remove(link / name)
+        for name in names:
+            if not os.path.lexists(link / name):
+                materialize_image(target / name, link / name, 'hardlink')
+
+def convert_directory(input_root, output_root, link_mode='copy', workers=1, force=False,
+                      split_options=None, stratify=False, label_options=None):
+    """Convert an extracted export (input_root/data/...) into output_root. Returns the list of per-file errors.
+    With stratify, class ids of all labels are collected in one pass first to balance classes across splits.
+    label_options['format'] picks bbox labels, segmentation labels or both (see label_dirs), every label file
+    is read once either way; label_options['simplify'] is the simplification tolerance of polygons in pixels."""
     data_dir = input_root / "data"
 
     obj_data = parse_obj_data(data_dir / 'obj.data')
     class_names = read_class_names(data_dir / obj_data['names'])
 
-    for split in ['train', 'val']:
+    splits = split_names(split_options)
+    # Segmentation labels go to labels/ alone, or to their own dataset in segment/ next to bbox labels
+    segment_dataset = label_dirs(label_options)[1] not in (None, 'labels')
+    for split in splits:
         (output_root / 'images' / split).mkdir(parents=True, exist_ok=True)
         (output_root / 'labels' / split).mkdir(parents=True, exist_ok=True)
+        if segment_dataset:
+            (output_root / SEGMENT_DIR / 'labels' / split).mkdir(parents=True, exist_ok=True)
 
     with open(data_dir / obj_data['train'], 'r') as f:
-        image_paths = [line.strip() for line in f if line.strip()]
+        image_paths = parse_image_list(f)
+    image_classes = None
+    if stratify:
+        label_paths = {str(data_dir / 'obj_train_data' / label_name_for(p)): p for p in image_paths}
+        label_paths = {label_path: p for label_path, p in label_paths.items() if os.path.exists(label_path)}
+        image_classes = {label_paths[label_path]: set(stats.class_counts)
+                         for label_path, stats, _ in scan_labels(label_paths, workers) if stats is not None}
+    split_images = split_image_paths(image_paths, split_options, image_classes)
+
+    previous_items = {} if force else load_manifest(output_root)
+    keys = [f"{split}/{os.path.basename(img_path)}" for split, img_path in split_images]
+    tasks = [(data_dir, output_root, split, img_path, link_mode, previous_items.get(key), label_options)
+             for key, (split, img_path) in zip(keys, split_images)]
+    records, errors, updated = run_tasks(tasks, workers=workers)
 
-    image_paths = [line[len("data/"):] if line.startswith("data/") else line for line in image_paths]
-    split_index = int(0.8 * len(image_paths))
-    train_images = image_paths[:split_index]
-    val_images = image_paths[split_index:]
+    items = {key: record for key, record in zip(keys, records) if record is not None}
+    current_keys = set(keys)
+    stale = [record for key, record in previous_items.items() if key not in current_keys]
+    removed = prune_outputs(output_root, stale)
+    # Keep previous records of failed items so their outputs are not pruned on the next run
+    for key, record in zip(keys, records):
+        if record is None and key in previous_items:
+            items[key] = previous_items[key]
+    save_manifest(output_root, items)
 
-    for split, images in [('train', train_images), ('val', val_images)]:
-        for img_path in images:
+    generate_data_yaml(output_root, class_names, splits)
+    if segment_dataset:
+        link_segment_images(output_root, splits)
+        generate_data_yaml(output_root / SEGMENT_DIR, class_names, splits)
+    elif os.path.isdir(output_root / SEGMENT_DIR) and not os.path.islink(output_root / SEGMENT_DIR):
+        # Left by an earlier run with --format both; its labels are pruned above, and its data.yaml
+        # and image links would make an empty dataset look valid
+        shutil.rmtree(output_root / SEGMENT_DIR)
+    print(f"Rebuilt {updated}, unchanged {len(items) - updated}, pruned {removed} files.")
+    return errors
+
+def _is_export_metadata(name):
+    """obj.data, obj.names and image lists of an export, read before its images and labels."""
+    return name.endswith(('.data', '.names')) or (name.endswith('.txt') and '/obj_train_data/' not in f"/{name}")
+
+def convert_archive(archive_path, output, split_options=None, stratify=False, label_options=None):
+    """Convert a zipped or tarred export without extracting it. Images and labels are read once, in archive
+    order (plus one more pass over the labels with stratify); a tar archive is scanned once before that,
+    see ArchiveReader. Output is a directory or, if it has an archive suffix, a new archive.
+    label_options are those of convert_directory; images of a separate segment/ dataset are written with
+    the writer's write_copy (hard links, or a second copy in zip). Returns the list of per-file errors."""
+    tolerance = (label_options or {}).get('simplify')
+    bbox_dir, segment_dir = label_dirs(label_options)
+    segment_dataset = segment_dir not in (None, 'labels')
+    errors = []
+    with ArchiveReader(archive_path, preload=_is_export_metadata) as reader, open_writer(output) as writer:
+        obj_data_name = reader.find('obj.data')
+        if obj_data_name is None:
+            raise FileNotFoundError(f"obj.data not found in {archive_path}")
+        prefix = posixpath.dirname(obj_data_name)
+
+        def member(rel_path):
+            return posixpath.join(prefix, rel_path) if prefix else rel_path
+
+        obj_data = parse_obj_data_lines(reader.read_text(obj_data_name).splitlines())
+        class_names = [line.strip() for line in reader.read_text(member(obj_data['names'])).splitlines() if line.strip()]
+        image_paths = parse_image_list(reader.read_text(member(obj_data['train'])).splitlines())
+        image_classes = None
+        if stratify:
+            label_members = {member(f"obj_train_data/{label_name_for(p)}"): p for p in image_paths}
+            label_members = {name: p for name, p in label_members.items() if reader.exists(name)}
+            image_classes = {}
+            for label_member in reader.in_archive_order(label_members):
+                stats = label_text_stats(reader.read_text(label_member).splitlines())
+                image_classes[label_members[label_member]] = set(stats.class_counts)
+        split_images = split_image_paths(image_paths, split_options, image_classes)
+
+        # Archive member -> output name below images/ for images, below the label folders for labels
+        targets = {}
+        labels = set()
+        label_images = {}  # label member -> image member
+        for split, img_path in split_images:
             img_name = os.path.basename(img_path)
-            label_name = os.path.splitext(img_name)[0] + '.txt'
+            label_name = label_name_for(img_name)
+            if not reader.exists(member(img_path)):
+                errors.append((img_path, "image not found in archive"))
+                continue
+            targets[member(img_path)] = f"images/{split}/{img_name}"
+            if reader.exists(member(f"obj_train_data/{label_name}")):
+                targets[member(f"obj_train_data/{label_name}")] = f"{split}/{label_name}"
+                labels.add(member(f"obj_train_data/{label_name}"))
+                label_images[member(f"obj_train_data/{label_name}")] = member(img_path)
 
-            shutil.copy(data_dir / img_path, output_root / 'images' / split / img_name)
+        # With simplification a label needs the size of its image. Images are read once, when their turn
+        # in the archive comes, so a label stored before its image waits for it
+        needs_size = bool(tolerance and segment_dir)
+        image_labels = {image: label for label, image in label_images.items()}
+        image_sizes = {}
+        pending = {}  # image member -> (label member, label text)
 
-            input_annotation_path = data_dir / 'obj_train_data' / label_name
-            output_annotation_path = output_root / 'labels' / split / label_name
-            if input_annotation_path.exists():
-                convert_annotation(input_annotation_path, output_annotation_path)
+        def write_label(name, text):
+            output_name = targets[name]
+            with profiler.stage('convert'):
+                if bbox_dir:
+                    writer.write_text(f"{bbox_dir}/{output_name}", convert_annotation_text(text))
+                if segment_dir:
+                    image_size = image_sizes.get(label_images[name])
+                    writer.write_text(f"{segment_dir}/{output_name}", segment_annotation_text(text, image_size, tolerance))
+
+        def skip(name, error):
+            errors.append((name, str(error)))
+            print(f"\nSkipped: {name} ({error})")
+
+        total = len(targets)
+        report_every = max(1, total // 100)
+        for done, name in enumerate(reader.in_archive_order(targets), 1):
+            output_name = targets[name]
+            profiler.count('files')
+            profiler.count('bytes_read', reader.size(name))
+            try:
+                if name in labels:
+                    with profiler.stage('read'):
+                        text = reader.read_text(name)
+                    if needs_size and label_images[name] not in image_sizes:
+                        pending[label_images[name]] = (name, text)
+                    else:
+                        write_label(name, text)
+                else:
+                    with profiler.stage('copy'):
+                        with reader.open(name) as f:
+                            if needs_size and name in image_labels:
+                                data = f.read()
+                                image_sizes[name] = read_image_size(io.BytesIO(data))
+                                writer.write_stream(output_name, io.BytesIO(data), len(data))
+                            else:
+                                writer.write_stream(output_name, f, reader.size(name))
+                        if segment_dataset:
+                            writer.write_copy(f"{SEGMENT_DIR}/{output_name}", output_name)
+                    profiler.count('images')
+            except Exception as e:
+                skip(name, e)
+            if name in pending and name in image_sizes:
+                try:
+                    write_label(*pending.pop(name))
+                except Exception as e:
+                    skip(image_labels[name], e)
+            if done % report_every == 0 or done == total:
+                print(f"\rProcessed {done}/{total}", end='', flush=True)
+        if total:
+            print()
+        for label_name, _ in pending.values():
+            skip(label_name, "size of its image not available")
+
+        writer.write_text('data.yaml', data_yaml_text(strip_archive_suffix(output), class_names,
+                                                      split_names(split_options)))
+        if segment_dataset:
+            writer.write_text(f"{SEGMENT_DIR}/data.yaml",
+                              data_yaml_text(posixpath.join(strip_archive_suffix(output), SEGMENT_DIR), class_names,
+                                             split_names(split_options)))
+        elif not is_archive_path(output) and os.path.isdir(os.path.join(output, SEGMENT_DIR)):
+            # segment/ of an earlier run into the same folder would look like a current dataset
+            shutil.rmtree(os.path.join(output, SEGMENT_DIR))
+    return errors
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert annotation format to YOLO-compatible structure.')
+    parser.add_argument('input_dir', type=str, help='Path to directory containing the "data" folder with obj.data, obj.names, etc., '
+                                                    'or to a .zip/.tar export')
+    parser.add_argument('--output_dir', type=str, default=None, help='Path to output directory (defaults to <input_dir>_converted); '
+                                                                     'a .zip/.tar path writes an archive when converting an archive')
+    parser.add_argument('--link-mode', choices=LINK_MODES, default='copy',
+                        help='How images are placed into the output (default: copy); falls back to copy when not possible')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes (default: 1, serial)')
+    parser.add_argument('--force', action='store_true', help='Ignore the manifest of a previous run and rebuild everything')
+    parser.add_argument('--split', type=parse_ratios, default=DEFAULT_RATIOS,
+                        help='Split ratios, e.g. train=0.7,val=0.2,test=0.1 (default: train=0.8,val=0.2)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the split assignment')
+    parser.add_argument('--group-by', choices=GROUP_MODES, default='frames',
+                        help='Keep ranges of consecutive frames (default), whole sequences (same name up to the '
+                             'frame number) or single images in one split')
+    parser.add_argument('--group-frames', type=int, default=DEFAULT_GROUP_FRAMES,
+                        help=f'Frame numbers per range with --group-by frames (default: {DEFAULT_GROUP_FRAMES})')
+    parser.add_argument('--stratify', action='store_true', help='Balance classes across splits')
+    parser.add_argument('--format', choices=LABEL_FORMATS, default=None,
+                        help='Labels to write: bbox, seg (polygons in labels/) or both (polygons in segment/); '
+                             'default: bbox')
+    parser.add_argument('--simplify', type=float, default=None, metavar='PIXELS',
+                        help='Simplify polygons of segmentation labels with this tolerance (needs --format seg or both)')
+    parser.add_argument('--profile', metavar='PATH', help='Record stage timings and write them to a .json or .csv file at exit')
+    args = parser.parse_args()
+    if args.simplify is not None and args.format in (None, 'bbox'):
+        parser.error("--simplify needs --format seg or both")
+    if args.profile:
+        profiler.enable(args.profile)
+    label_options = {}
+    if args.format:
+        label_options['format'] = args.format
+    if args.simplify is not None:
+        label_options['simplify'] = args.simplify
+    split_options = {'ratios': args.split, 'seed': args.seed, 'group_by': args.group_by, 'group_frames': args.group_frames}
+
+    if is_archive_path(args.input_dir):
+        # Archive members are streamed sequentially: link modes, workers and the manifest do not apply
+        ignored = [option for option, used in [('--workers', args.workers != 1), ('--link-mode', args.link_mode != 'copy'),
+                                               ('--force', args.force)] if used]
+        if ignored:
+            print(f"Warning: {', '.join(ignored)} not supported for archive input, ignored")
+        output = args.output_dir or strip_archive_suffix(args.input_dir) + '_converted'
+        errors = convert_archive(args.input_dir, output, split_options, args.stratify, label_options)
+    else:
+        input_root = Path(args.input_dir)
+        output_root = Path(args.output_dir) if args.output_dir else Path(str(input_root) + '_converted')
+        errors = convert_directory(input_root, output_root, args.link_mode, args.workers, args.force,
+                                   split_options, args.stratify, label_options)
 
-    generate_data_yaml(output_root, class_names)
+    if errors:
+        print(f"Done with {len(errors)} errors.")
+    else:
+        print("Done.")
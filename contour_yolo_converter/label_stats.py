@@ -0,0 +1,223 @@
+import os
+import json
+import argparse
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from common.file_discovery import find_files, IMAGE_EXTENSIONS
+
+ISSUE_KINDS = ['malformed', 'no_points', 'odd_coordinates', 'out_of_range', 'degenerate']
+HISTOGRAM_BINS = 256  # polygons with more vertices share the last bin
+MIN_AREA = 1e-12  # normalized polygon area below which a polygon is degenerate
+
+# Statistics of one label file:
+# class_counts - Counter of polygons per class id,
+# vertex_counts - int array with the vertex count of every polygon,
+# issues - [(line number, issue kind)] of lines that converters and the viewer skip or can't use.
+FileStats = namedtuple('FileStats', ['class_counts', 'vertex_counts', 'issues'])
+
+def label_file_stats(label_path):
+    """Parse one label file and check its polygons. Returns FileStats."""
+    with open(label_path, 'r') as f:
+        return label_text_stats(f)
+
+def label_text_stats(lines):
+    """Same as label_file_stats, but takes the text lines of a label file."""
+    class_counts = Counter()
+    issues = []
+    sizes = []
+    line_numbers = []
+    values = []
+    for line_number, line in enumerate(lines, 1):
+        parts = line.split()
+        if not parts:
+            continue
+        try:
+            class_id = int(parts[0])
+            numbers = list(map(float, parts[1:]))
+        except ValueError:
+            issues.append((line_number, 'malformed'))
+            continue
+        if class_id < 0:
+            issues.append((line_number, 'malformed'))
+            continue
+        if len(numbers) % 2:
+            # converter.py skips such lines, the viewer drops the last coordinate
+            issues.append((line_number, 'odd_coordinates'))
+            numbers.pop()
+        if not numbers:
+            issues.append((line_number, 'no_points'))
+            continue
+        class_counts[class_id] += 1
+        sizes.append(len(numbers) // 2)
+        line_numbers.append(line_number)
+        values.extend(numbers)
+
+    vertex_counts = np.array(sizes, dtype=np.int64)
+    if len(sizes):
+        points = np.array(values, dtype=np.float64).reshape(-1, 2)
+        starts = np.concatenate(([0], np.cumsum(vertex_counts)[:-1]))
+
+        # Any vertex outside the image
+        outside = ((points < 0) | (points > 1)).any(axis=1)
+        out_of_range = np.logical_or.reduceat(outside, starts)
+
+        # Shoelace area, the vertex after the last one of a polygon is its first one
+        following = np.arange(1, len(points) + 1)
+        following[starts + vertex_counts - 1] = starts
+        cross = points[:, 0] * points[following, 1] - points[following, 0] * points[:, 1]
+        area = np.abs(np.add.reduceat(cross, starts)) / 2
+        degenerate = (vertex_counts < 3) | (area < MIN_AREA)
+
+        for i in np.flatnonzero(out_of_range).tolist():
+            issues.append((line_numbers[i], 'out_of_range'))
+        for i in np.flatnonzero(degenerate).tolist():
+            issues.append((line_numbers[i], 'degenerate'))
+    issues.sort()
+    return FileStats(class_counts, vertex_counts, issues)
+
+def _stats_chunk(paths):
+    results = []
+    for path in paths:
+        try:
+            results.append((path, label_file_stats(path), None))
+        except (OSError, UnicodeDecodeError) as e:
+            results.append((path, None, str(e)))
+    return results
+
+def scan_labels(label_paths, workers=1, chunk_size=256):
+    """Yields (label path, FileStats or None, error message or None) for every label file, in order.
+    Files are read in chunks across a process pool with a few chunks per worker in flight,
+    so memory doesn't grow with the dataset."""
+    label_paths = list(label_paths)
+    chunks = (label_paths[i:i + chunk_size] for i in range(0, len(label_paths), chunk_size))
+    if workers <= 1:
+        for chunk in chunks:
+            yield from _stats_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_stats_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+class DatasetReport:
+    """Aggregates FileStats of a dataset into a JSON-serializable report."""
+    def __init__(self, max_examples=1000):
+        self.max_examples = max_examples
+        self.files = 0
+        self.polygons = 0
+        self.vertices = 0
+        self.class_polygons = Counter()
+        self.class_files = Counter()
+        self.histogram = np.zeros(HISTOGRAM_BINS + 1, dtype=np.int64)
+        self.issues = {kind: self._group() for kind in ISSUE_KINDS}
+        self.empty_files = self._group()
+        self.unreadable_files = self._group()
+        self.unlabeled_images = self._group()
+        self.orphan_labels = self._group()
+
+    @staticmethod
+    def _group():
+        return {'count': 0, 'examples': []}
+
+    def _note(self, group, example):
+        group['count'] += 1
+        if len(group['examples']) < self.max_examples:
+            group['examples'].append(example)
+
+    def add(self, label_path, stats, error=None):
+        self.files += 1
+        if stats is None:
+            self._note(self.unreadable_files, f"{label_path} ({error})")
+            return
+        if not len(stats.vertex_counts):
+            self._note(self.empty_files, label_path)
+        self.polygons += len(stats.vertex_counts)
+        self.vertices += int(stats.vertex_counts.sum())
+        self.class_polygons.update(stats.class_counts)
+        self.class_files.update(stats.class_counts.keys())
+        self.histogram += np.bincount(np.minimum(stats.vertex_counts, HISTOGRAM_BINS), minlength=HISTOGRAM_BINS + 1)
+        for line_number, kind in stats.issues:
+            self._note(self.issues[kind], f"{label_path}:{line_number}")
+
+    def add_pairing(self, image_paths, label_paths):
+        """Records images without a label file and label files without an image, matched by file stem."""
+        image_stems = {Path(path).with_suffix('') for path in image_paths}
+        label_stems = {Path(path).with_suffix('') for path in label_paths}
+        for path in image_paths:
+            if Path(path).with_suffix('') not in label_stems:
+                self._note(self.unlabeled_images, path)
+        for path in label_paths:
+            if Path(path).with_suffix('') not in image_stems:
+                self._note(self.orphan_labels, path)
+
+    def issue_count(self):
+        return sum(group['count'] for group in self.issues.values()) + self.unreadable_files['count']
+
+    def to_dict(self):
+        histogram = {str(n): int(count) for n, count in enumerate(self.histogram.tolist()) if count}
+        if self.histogram[HISTOGRAM_BINS]:
+            histogram[f"{HISTOGRAM_BINS}+"] = histogram.pop(str(HISTOGRAM_BINS))
+        return {
+            'label_files': self.files,
+            'polygons': self.polygons,
+            'vertices': self.vertices,
+            'classes': {str(class_id): {'polygons': self.class_polygons[class_id], 'files': self.class_files[class_id]}
+                        for class_id in sorted(self.class_polygons)},
+            'vertex_histogram': histogram,
+            'issues': self.issues,
+            'empty_label_files': self.empty_files,
+            'unreadable_label_files': self.unreadable_files,
+            'unlabeled_images': self.unlabeled_images,
+            'orphan_labels': self.orphan_labels,
+        }
+
+def validate_dataset(labels_dir, images_dir=None, workers=1, recursive=False, max_examples=1000):
+    """Collect statistics and issues of every label file in labels_dir, paired with images in images_dir
+    (labels_dir by default). Returns DatasetReport."""
+    images_dir = images_dir or labels_dir
+    label_paths = find_files(labels_dir, {'.txt'}, recursive)
+    image_paths = find_files(images_dir, IMAGE_EXTENSIONS, recursive)
+
+    report = DatasetReport(max_examples)
+    for done, (label_path, stats, error) in enumerate(scan_labels(label_paths, workers), 1):
+        report.add(label_path, stats, error)
+        if done % 1000 == 0 or done == len(label_paths):
+            print(f"\rChecked {done}/{len(label_paths)}", end='', flush=True)
+    print()
+
+    # Pairing is by path without extension, relative to each folder
+    report.add_pairing([os.path.relpath(p, images_dir) for p in image_paths],
+                       [os.path.relpath(p, labels_dir) for p in label_paths])
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Collect statistics of contour labels and report malformed ones.')
+    parser.add_argument('labels_dir', help='Folder with .txt label files')
+    parser.add_argument('--images_dir', help='Folder with images (defaults to labels_dir)')
+    parser.add_argument('--output', default='label_report.json', help='Path of the JSON report')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of worker processes')
+    parser.add_argument('--recursive', action='store_true', help='Also check subfolders')
+    parser.add_argument('--max_examples', type=int, default=1000, help='Examples listed per issue kind')
+    args = parser.parse_args()
+
+    report = validate_dataset(args.labels_dir, args.images_dir, args.workers, args.recursive, args.max_examples)
+    with open(args.output, 'w') as f:
+        json.dump(report.to_dict(), f, indent=2)
+
+    print(f"{report.files} label files, {report.polygons} polygons, {len(report.class_polygons)} classes.")
+    for kind, group in report.issues.items():
+        if group['count']:
+            print(f"{kind}: {group['count']}")
+    for name, group in [('unlabeled images', report.unlabeled_images), ('orphan labels', report.orphan_labels)]:
+        if group['count']:
+            print(f"{name}: {group['count']}")
+    print(f"Report written to {args.output}")
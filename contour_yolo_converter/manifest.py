@@ -0,0 +1,61 @@
+import os
+import json
+import hashlib
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+def hash_file(path, chunk_size=1 << 20):
+    """Return sha256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def file_info(path, previous=None):
+    """Describe a source file as {'source', 'size', 'mtime', 'sha256'}.
+    The hash of previous is reused when size and mtime are unchanged."""
+    st = os.stat(path)
+    if previous and previous['size'] == st.st_size and previous['mtime'] == st.st_mtime_ns:
+        sha256 = previous['sha256']
+    else:
+        sha256 = hash_file(path)
+    return {'source': str(path), 'size': st.st_size, 'mtime': st.st_mtime_ns, 'sha256': sha256}
+
+def same_content(a, b):
+    """Check whether two file_info records (or None) describe the same source content."""
+    if a is None or b is None:
+        return a is b
+    return a['source'] == b['source'] and a['sha256'] == b['sha256']
+
+def load_manifest(output_root):
+    """Load {item_key: record} from the output directory, or {} if there is no usable manifest."""
+    path = os.path.join(output_root, MANIFEST_NAME)
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get('version') != MANIFEST_VERSION:
+        return {}
+    return data.get('items', {})
+
+def save_manifest(output_root, items):
+    """Atomically write {item_key: record} to the output directory."""
+    path = os.path.join(output_root, MANIFEST_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': MANIFEST_VERSION, 'items': items}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def prune_outputs(output_root, stale_records):
+    """Remove output files of records whose source no longer exists. Returns the number of removed files."""
+    removed = 0
+    for record in stale_records:
+        for output in record.get('outputs', []):
+            path = os.path.join(output_root, output)
+            if os.path.lexists(path):
+                os.remove(path)
+                removed += 1
+    return removed
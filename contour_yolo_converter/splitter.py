@@ -0,0 +1,115 @@
+import re
+import hashlib
+import posixpath
+from collections import Counter
+
+DEFAULT_RATIOS = {'train': 0.8, 'val': 0.2}
+GROUP_MODES = ['frames', 'sequence', 'image']
+# Consecutive frame numbers of a sequence kept in one split by the default 'frames' grouping
+DEFAULT_GROUP_FRAMES = 10
+_TRAILING_NUMBER = re.compile(r'^(.*?)(\d+)$')
+
+def parse_ratios(text):
+    """Parse 'train=0.8,val=0.2' into {'train': 0.8, 'val': 0.2}, normalized to sum to 1."""
+    ratios = {}
+    for part in text.split(','):
+        name, sep, value = part.partition('=')
+        if not sep or not name.strip():
+            raise ValueError(f"Split must be NAME=RATIO, got '{part}'")
+        ratios[name.strip()] = float(value)
+    total = sum(ratios.values())
+    if total <= 0 or any(ratio < 0 for ratio in ratios.values()):
+        raise ValueError("Split ratios must be non-negative and not all zero")
+    return {name: ratio / total for name, ratio in ratios.items()}
+
+def group_key(img_path, group_by='frames', group_frames=None):
+    """Key of the group an image is split with. A sequence is the images of a folder whose names differ
+    only in the trailing frame number (frame_000012.jpg belongs to frame_). 'frames' keeps ranges of
+    group_frames (default: DEFAULT_GROUP_FRAMES) consecutive frame numbers of a sequence together, so
+    near-duplicate neighbours don't end up in different splits; 'sequence' keeps whole sequences together;
+    'image' keeps every image on its own. Images without a frame number are always on their own."""
+    folder, name = posixpath.split(img_path.replace('\\', '/'))
+    stem = posixpath.splitext(name)[0]
+    match = _TRAILING_NUMBER.match(stem)
+    if match is None or group_by == 'image':
+        return f"{folder}/{stem}"
+    if group_by == 'sequence':
+        return f"{folder}/{match.group(1)}"
+    return f"{folder}/{match.group(1)}#{int(match.group(2)) // (group_frames or DEFAULT_GROUP_FRAMES)}"
+
+def stable_fraction(key, seed=0):
+    """Deterministic pseudo-random number in [0, 1) for the key. Doesn't depend on other keys,
+    so an image keeps its split when images are added or removed"""
+    digest = hashlib.blake2b(f"{seed}:{key}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2**64
+
+def pick_split(fraction, ratios):
+    """Split whose share of [0, 1) contains fraction."""
+    cumulative = 0.0
+    for name, ratio in ratios.items():
+        cumulative += ratio
+        if fraction < cumulative:
+            return name
+    return next(name for name, ratio in reversed(list(ratios.items())) if ratio > 0)
+
+def assign_splits(image_paths, ratios=None, seed=0, group_by='frames', group_frames=None, image_classes=None):
+    """Assign image paths to splits. Returns [(split, img_path), ...] in input order.
+
+    Groups of images (see group_key) always land in the same split. Without image_classes every group is
+    placed by a seeded hash of its key. image_classes maps an image path to the set of class ids it contains
+    (from one pass of label_stats.scan_labels); groups are then assigned so that every class is spread
+    over the splits in proportion to the ratios: groups with rare classes go first, each to the split that
+    still needs most of its rarest class. The hash breaks ties, so the result is deterministic for a given
+    dataset and seed, but may shift when groups with labels are added.
+    A warning is printed for every split with a non-zero ratio that gets no images, e.g. when one video
+    is kept whole or falls into a few frame ranges."""
+    ratios = {name: ratio for name, ratio in (ratios or DEFAULT_RATIOS).items() if ratio > 0}
+    groups = {}
+    for img_path in image_paths:
+        groups.setdefault(group_key(img_path, group_by, group_frames), []).append(img_path)
+    fractions = {key: stable_fraction(key, seed) for key in groups}
+
+    if image_classes is None:
+        group_splits = {key: pick_split(fractions[key], ratios) for key in groups}
+    else:
+        group_splits = _stratified_splits(groups, fractions, ratios, image_classes)
+
+    image_splits = {img_path: group_splits[key] for key, paths in groups.items() for img_path in paths}
+    split_sizes = Counter(group_splits[key] for key, paths in groups.items() for _ in paths)
+    for name in ratios:
+        if image_paths and not split_sizes[name]:
+            print(f"Warning: split '{name}' got no images, the {len(image_paths)} images form {len(groups)} group(s); "
+                  f"use smaller --group-frames or another --group-by")
+    return [(image_splits[img_path], img_path) for img_path in image_paths]
+
+def _stratified_splits(groups, fractions, ratios, image_classes):
+    """Iterative stratification over groups, counting images that contain each class."""
+    group_classes = {key: Counter(c for img_path in paths for c in image_classes.get(img_path, ()))
+                     for key, paths in groups.items()}
+    class_totals = Counter()
+    for counts in group_classes.values():
+        class_totals.update(counts)
+    total_images = sum(len(paths) for paths in groups.values())
+
+    # Images of each class, and images overall, still wanted by every split
+    demand = {name: {c: ratio * total for c, total in class_totals.items()} for name, ratio in ratios.items()}
+    size_demand = {name: ratio * total_images for name, ratio in ratios.items()}
+
+    def rarity(key):
+        counts = group_classes[key]
+        return min((class_totals[c] for c in counts), default=float('inf')), fractions[key]
+
+    group_splits = {}
+    for key in sorted(groups, key=rarity):
+        counts = group_classes[key]
+        preferred = pick_split(fractions[key], ratios)
+        if counts:
+            rarest = min(counts, key=lambda c: (class_totals[c], c))
+            split = max(ratios, key=lambda name: (demand[name][rarest], size_demand[name], name == preferred))
+        else:
+            split = max(ratios, key=lambda name: (size_demand[name], name == preferred))
+        group_splits[key] = split
+        for c, count in counts.items():
+            demand[split][c] -= count
+        size_demand[split] -= len(groups[key])
+    return group_splits
@@ -0,0 +1,61 @@
+import os
+import math
+import time
+import shutil
+import argparse
+import tempfile
+from PIL import Image, ImageChops, ImageStat
+
+from image_size_changer import resize_image
+
+def make_image(path, size, quality=92):
+    """Writes a synthetic JPEG with fine detail (fractal, gradients and noise) of the given size"""
+    fractal = Image.effect_mandelbrot(size, (-2.0, -1.2, 1.0, 1.2), 100)
+    gradients = Image.merge('RGB', [
+        Image.linear_gradient('L').resize(size),
+        Image.radial_gradient('L').resize(size),
+        Image.effect_noise(size, 40),
+    ])
+    ImageChops.add(fractal.convert('RGB'), gradients, scale=2).save(path, 'JPEG', quality=quality)
+
+def psnr(a, b):
+    """Peak signal-to-noise ratio between two RGB images in dB"""
+    rms = ImageStat.Stat(ImageChops.difference(a.convert('RGB'), b.convert('RGB'))).rms
+    mse = sum(r * r for r in rms) / len(rms)
+    return float('inf') if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+
+def time_resize(path, output_dir, size, draft, repeats):
+    """Best time of resizing the image, in seconds"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        resize_image(path, output_dir, size, draft)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare full and draft-mode decoding of large JPEGs in the resizer.')
+    parser.add_argument('--size', type=str, default='512x512', help='Target size, format: WIDTHxHEIGHT')
+    parser.add_argument('--repeats', type=int, default=3, help='Timed runs per input, the best one is reported')
+    args = parser.parse_args()
+    target = tuple(map(int, args.size.lower().split('x')))
+
+    folder = tempfile.mkdtemp(prefix='resize_bench_')
+    try:
+        full_dir = os.path.join(folder, 'full')
+        draft_dir = os.path.join(folder, 'draft')
+        os.makedirs(full_dir)
+        os.makedirs(draft_dir)
+
+        print(f"{'input':>10} {'full, ms':>10} {'draft, ms':>10} {'speedup':>8} {'PSNR, dB':>9}")
+        for name, size in [('4K', (3840, 2160)), ('8K', (7680, 4320))]:
+            path = os.path.join(folder, f"{name}.jpg")
+            make_image(path, size)
+            full_time = time_resize(path, full_dir, target, False, args.repeats)
+            draft_time = time_resize(path, draft_dir, target, True, args.repeats)
+            with Image.open(os.path.join(full_dir, f"{name}.jpg")) as full, \
+                    Image.open(os.path.join(draft_dir, f"{name}.jpg")) as draft:
+                quality = psnr(full, draft)
+            print(f"{name:>10} {full_time * 1000:10.1f} {draft_time * 1000:10.1f} {full_time / draft_time:7.2f}x {quality:9.2f}")
+    finally:
+        shutil.rmtree(folder)
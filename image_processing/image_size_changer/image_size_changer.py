@@ -1,45 +1,189 @@
 import os
+import time
 import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 from PIL import Image
-import glob
 
-def resize_images(input_dir, output_dir=None, size=(512, 512), overwrite=False):
+from common.file_discovery import find_files, IMAGE_EXTENSIONS
+from common.profiler import profiler, init_worker
+
+FAILURES_NAME = 'failures.txt'
+# Draft decoding keeps at least this many times the target resolution
+DRAFT_GAP = 2
+# Non-JPEG images are reduced by box averaging down to this many times the target size before LANCZOS
+REDUCING_GAP = 3.0
+LABEL_FORMATS = ['contour', 'bbox']
+
+def transform_labels(text, scale, offset, label_format='contour'):
+    """Moves normalized label coordinates into the letterboxed image: every x becomes x * scale[0] + offset[0]
+    and every y becomes y * scale[1] + offset[1]. In bbox labels (class x_center y_center width height)
+    width and height are only scaled"""
+    rows = [line.split() for line in text.splitlines()]
+    rows = [row for row in rows if row]
+    if not rows:
+        return ""
+    sizes = np.array([len(row) - 1 for row in rows])
+    values = np.array([v for row in rows for v in row[1:]], dtype=np.float64)
+
+    # Position of every value within its line decides if it is x or y, and a coordinate or a size
+    position = np.arange(len(values)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    is_y = position % 2 == 1
+    multiplier = np.where(is_y, scale[1], scale[0])
+    shift = np.where(is_y, offset[1], offset[0])
+    if label_format == 'bbox':
+        shift[position >= 2] = 0
+    formatted = np.char.mod('%.6f', values * multiplier + shift)
+
+    lines = []
+    start = 0
+    for row, size in zip(rows, sizes.tolist()):
+        lines.append(" ".join([row[0]] + formatted[start:start + size].tolist()) + "\n")
+        start += size
+    return "".join(lines)
+
+def resize_image(img_path, output_dir, size, draft=True, label_format=None, input_dir=None):
+    """Letterboxes one image to size on a white background and saves it to output_dir (in place if None),
+    keeping its path relative to input_dir if given.
+    With draft, JPEGs are decoded straight at a reduced scale and other images are pre-reduced before resampling.
+    With label_format, the .txt labels next to the image are moved to the letterboxed coordinates as well"""
+    profiler.count_file(img_path)
+    img = Image.open(img_path)
+    img_ratio = img.width / img.height
+    target_ratio = size[0] / size[1]
+
+    if img_ratio > target_ratio:
+        resized_size = (size[0], int(size[0] / img_ratio))
+    elif img_ratio < target_ratio:
+        resized_size = (int(size[1] * img_ratio), size[1])
+    else:
+        resized_size = size
+
+    reducing_gap = None
+    if draft:
+        # JPEG DCT scaling to 1/2, 1/4 or 1/8 while decoding, keeping at least DRAFT_GAP times
+        # the target resolution for the final LANCZOS pass
+        img.draft(img.mode, (resized_size[0] * DRAFT_GAP, resized_size[1] * DRAFT_GAP))
+        reducing_gap = REDUCING_GAP
+    with profiler.stage('decode_resize'):
+        resized = img.resize(resized_size, Image.LANCZOS, reducing_gap=reducing_gap)
+
+    padding = ((size[0] - resized_size[0]) // 2, (size[1] - resized_size[1]) // 2)
+    if resized_size == size:
+        result = resized
+    else:
+        result = Image.new("RGB", size, (255, 255, 255))
+        result.paste(resized, padding)
+
+    # Labels are transformed before anything is written, so a malformed label leaves both files untouched
+    # (with --overwrite a letterboxed image next to its old label could not be fixed by a rerun)
+    labels = None
+    if label_format:
+        label_path = os.path.splitext(img_path)[0] + '.txt'
+        if os.path.exists(label_path):
+            with profiler.stage('labels'):
+                with open(label_path) as f:
+                    text = f.read()
+                scale = (resized_size[0] / size[0], resized_size[1] / size[1])
+                offset = (padding[0] / size[0], padding[1] / size[1])
+                labels = transform_labels(text, scale, offset, label_format)
+            profiler.count_file(label_path)
+
+    if output_dir is None:
+        save_path = img_path
+    else:
+        relative_path = os.path.relpath(img_path, input_dir) if input_dir else os.path.basename(img_path)
+        save_path = os.path.join(output_dir, relative_path)
+        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    with profiler.stage('save'):
+        result.save(save_path, format=img.format or 'JPEG')
+
+    if labels is not None:
+        with open(os.path.splitext(save_path)[0] + '.txt', 'w') as f:
+            f.write(labels)
+
+def shared_labels(image_files):
+    """{image path: label path} of images whose .txt label belongs to another image as well, e.g. a.jpg and a.png
+    both next to a.txt. Letterboxing the label once per image would transform it twice"""
+    images_by_label = {}
+    for img_path in image_files:
+        images_by_label.setdefault(os.path.splitext(img_path)[0] + '.txt', []).append(img_path)
+    return {img_path: label_path for label_path, paths in images_by_label.items()
+            if len(paths) > 1 and os.path.exists(label_path) for img_path in paths}
+
+def resize_chunk(task):
+    """Resizes a chunk of images. Returns (number of images, [(image path, error message)] of the ones that failed)"""
+    paths, input_dir, output_dir, size, draft, label_format = task
+    failures = []
+    for img_path in paths:
+        try:
+            with profiler.stage('image'):
+                resize_image(img_path, output_dir, size, draft, label_format, input_dir)
+        except Exception as e:
+            failures.append((img_path, str(e)))
+    return len(paths), failures
+
+def resize_chunk_in_worker(task):
+    """resize_chunk in a pool worker, adding the timings recorded in the worker (None unless profiling)"""
+    return resize_chunk(task) + (profiler.collect(),)
+
+def run_chunks(tasks, workers):
+    """Yields results of resize_chunk in order, plus the timings recorded in the worker (None when serial).
+    Only a few chunks per worker are in flight, so memory stays bounded no matter how many images there are"""
+    if workers <= 1:
+        for task in tasks:
+            yield resize_chunk(task) + (None,)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(profiler.enabled,)) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(resize_chunk_in_worker, task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def resize_images(input_dir, output_dir=None, size=(512, 512), overwrite=False, workers=1, chunk_size=64, draft=True, label_format=None,
+                  recursive=False):
     if output_dir is None and not overwrite:
         output_dir = os.path.join(input_dir, 'resized')
         os.makedirs(output_dir, exist_ok=True)
     elif output_dir:
         os.makedirs(output_dir, exist_ok=True)
 
-    extensions = ['*.jpg', '*.jpeg', '*.png', '*.bmp', '*.webp']
-    image_files = []
-    for ext in extensions:
-        image_files.extend(glob.glob(os.path.join(input_dir, ext)))
-        image_files.extend(glob.glob(os.path.join(input_dir, ext.upper())))
+    # Results of a previous run inside the input folder are not resized again
+    image_files = find_files(input_dir, IMAGE_EXTENSIONS, recursive, exclude=[output_dir] if output_dir else [])
+    failures = []
+    if label_format:
+        # Which image such a label belongs to is ambiguous, so neither image nor label is touched
+        shared = shared_labels(image_files)
+        for img_path in sorted(shared):
+            error = f"label {os.path.basename(shared[img_path])} is shared with another image"
+            print(f"Skipped: {os.path.basename(img_path)} ({error})")
+            failures.append((img_path, error))
+        image_files = [img_path for img_path in image_files if img_path not in shared]
 
-    for img_path in image_files:
-        try:
-            img = Image.open(img_path)
-            img_ratio = img.width / img.height
-            target_ratio = size[0] / size[1]
-
-            if img_ratio > target_ratio:
-                new_height = int(size[0] / img_ratio)
-                resized = img.resize((size[0], new_height), Image.LANCZOS)
-                result = Image.new("RGB", size, (255, 255, 255))
-                result.paste(resized, (0, (size[1] - new_height) // 2))
-            elif img_ratio < target_ratio:
-                new_width = int(size[1] * img_ratio)
-                resized = img.resize((new_width, size[1]), Image.LANCZOS)
-                result = Image.new("RGB", size, (255, 255, 255))
-                result.paste(resized, ((size[0] - new_width) // 2, 0))
-            else:
-                result = img.resize(size, Image.LANCZOS)
-
-            save_path = img_path if output_dir is None else os.path.join(output_dir, os.path.basename(img_path))
-            result.save(save_path, format=img.format or 'JPEG')
+    tasks = ((image_files[i:i + chunk_size], input_dir, output_dir, size, draft, label_format) for i in range(0, len(image_files), chunk_size))
+    done = 0
+    start = time.perf_counter()
+    for count, chunk_failures, profile in run_chunks(tasks, workers):
+        profiler.merge(profile)
+        for img_path, error in chunk_failures:
+            print(f"\nSkipped: {os.path.basename(img_path)} ({error})")
+        failures.extend(chunk_failures)
+        done += count
+        elapsed = time.perf_counter() - start
+        print(f"\rResized {done}/{len(image_files)} ({done / elapsed if elapsed else 0:.1f} images/s)", end='', flush=True)
+    print()
 
-        except Exception as e:
-            print(f"Skipped: {os.path.basename(img_path)} ({e})")
+    if failures:
+        failures_path = os.path.join(output_dir or input_dir, FAILURES_NAME)
+        with open(failures_path, 'w') as f:
+            for img_path, error in failures:
+                f.write(f"{img_path}\t{error}\n")
+        print(f"{len(failures)} images failed, see {failures_path}")
 
     print("Done.")
 
@@ -49,8 +193,17 @@ if __name__ == "__main__":
     parser.add_argument('--output_dir', help='Optional output directory')
     parser.add_argument('--overwrite', action='store_true', help='Overwrite original files')
     parser.add_argument('--size', type=str, default='512x512', help='Target size, format: WIDTHxHEIGHT (e.g. 512x512)')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes')
+    parser.add_argument('--chunk_size', type=int, default=64, help='Images sent to a worker at once')
+    parser.add_argument('--no_draft', action='store_true', help='Fully decode images before resizing (slower, exact)')
+    parser.add_argument('--recursive', action='store_true', help='Also resize images in subfolders, keeping the folder structure')
+    parser.add_argument('--labels', choices=LABEL_FORMATS, default=None,
+                        help='Also rewrite .txt labels next to the images: contour points or YOLO bboxes')
+    parser.add_argument('--profile', metavar='PATH', help='Record stage timings and write them to a .json or .csv file at exit')
 
     args = parser.parse_args()
+    if args.profile:
+        profiler.enable(args.profile)
     try:
         width, height = map(int, args.size.lower().split('x'))
     except:
@@ -60,5 +213,10 @@ if __name__ == "__main__":
         input_dir=args.input_dir,
         output_dir=args.output_dir,
         size=(width, height),
-        overwrite=args.overwrite
-    )
\ No newline at end of file
+        overwrite=args.overwrite,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        draft=not args.no_draft,
+        label_format=args.labels,
+        recursive=args.recursive
+    )
@@ -0,0 +1,49 @@
+import os
+
+from PIL import Image
+
+from image_size_changer import resize_images, FAILURES_NAME
+
+LABEL = "0 0.000000 0.000000 1.000000 1.000000\n"
+
+def write_frame(folder, name, size, label=True):
+    Image.new("RGB", size, (0, 0, 0)).save(os.path.join(folder, name))
+    if label:
+        with open(os.path.join(folder, os.path.splitext(name)[0] + '.txt'), 'w') as f:
+            f.write(LABEL)
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+def test_overwrite_transforms_label_once(tmp_path):
+    write_frame(tmp_path, 'b.jpg', (200, 100))
+    resize_images(str(tmp_path), size=(100, 100), overwrite=True, label_format='contour')
+
+    # 200x100 letterboxed into 100x100: y is scaled by 0.5 and shifted by 0.25
+    assert read(tmp_path / 'b.txt') == "0 0.000000 0.250000 1.000000 0.750000\n"
+
+def test_images_sharing_a_label_are_skipped(tmp_path):
+    write_frame(tmp_path, 'a.jpg', (200, 100))
+    write_frame(tmp_path, 'a.png', (100, 200), label=False)
+    write_frame(tmp_path, 'b.jpg', (200, 100))
+    resize_images(str(tmp_path), size=(100, 100), overwrite=True, label_format='contour')
+
+    assert read(tmp_path / 'a.txt') == LABEL
+    with Image.open(tmp_path / 'a.jpg') as img:
+        assert img.size == (200, 100)
+    with Image.open(tmp_path / 'a.png') as img:
+        assert img.size == (100, 200)
+    assert read(tmp_path / 'b.txt') == "0 0.000000 0.250000 1.000000 0.750000\n"
+    failed = [line.split('\t')[0] for line in read(tmp_path / FAILURES_NAME).splitlines()]
+    assert sorted(failed) == [str(tmp_path / 'a.jpg'), str(tmp_path / 'a.png')]
+
+def test_shared_label_names_without_labels_are_resized(tmp_path):
+    write_frame(tmp_path, 'a.jpg', (200, 100), label=False)
+    write_frame(tmp_path, 'a.png', (100, 200), label=False)
+    resize_images(str(tmp_path), size=(100, 100), overwrite=True, label_format='contour')
+
+    for name in ('a.jpg', 'a.png'):
+        with Image.open(tmp_path / name) as img:
+            assert img.size == (100, 100)
+    assert not os.path.exists(tmp_path / FAILURES_NAME)
@@ -0,0 +1,39 @@
+import numpy as np
+
+from converter import segment_annotation_text
+from image_processor import ImageProcessor
+
+def noisy_polygons(count=20, vertices=400, seed=0):
+    """Label text of dense, slightly noisy ellipses in normalized coordinates"""
+    rng = np.random.default_rng(seed)
+    lines = []
+    for i in range(count):
+        angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+        center = rng.uniform(0.3, 0.7, size=2)
+        radius = rng.uniform(0.05, 0.25, size=2) * (1 + rng.normal(0, 0.01, size=(vertices, 1)))
+        points = center + radius * np.stack([np.cos(angles), np.sin(angles)], axis=1)
+        lines.append(f"{i % 5} " + " ".join(f"{v:.6f}" for v in points.ravel()))
+    return "\n".join(lines) + "\n"
+
+def parse(text):
+    return [(int(line.split()[0]), np.array(line.split()[1:], dtype=np.float64).reshape(-1, 2))
+            for line in text.splitlines()]
+
+def test_converter_and_viewer_simplify_identically():
+    text = noisy_polygons()
+    image_size = (1920, 1080)
+    for tolerance in (0.5, 2.0, 8.0):
+        converted = parse(segment_annotation_text(text, image_size, tolerance))
+        viewed = ImageProcessor().simplify_markup(parse(text), image_size, tolerance)
+
+        class_ids, offsets, vertices = viewed
+        assert [class_id for class_id, _ in converted] == class_ids.tolist()
+        for (_, polygon), start, end in zip(converted, offsets[:-1], offsets[1:]):
+            assert len(polygon) == end - start
+            assert len(polygon) >= 3
+            np.testing.assert_allclose(polygon, vertices[start:end], atol=1e-6)
+
+def test_simplification_removes_vertices():
+    text = noisy_polygons(count=1)
+    simplified = parse(segment_annotation_text(text, (1920, 1080), 2.0))
+    assert 3 <= len(simplified[0][1]) < 400
@@ -0,0 +1,38 @@
+from collections import Counter
+
+from splitter import assign_splits, group_key
+
+def cvat_frames(count, folder='obj_train_data'):
+    return [f"{folder}/frame_{i:06d}.jpg" for i in range(count)]
+
+def test_sequence_key_strips_the_frame_number():
+    assert group_key('obj_train_data/frame_000012.jpg', 'sequence') == 'obj_train_data/frame_'
+    assert group_key('obj_train_data/frame_000012.jpg', 'image') == 'obj_train_data/frame_000012'
+    assert group_key('obj_train_data/cover.jpg') == 'obj_train_data/cover'
+
+def test_default_keeps_frame_ranges_together(capsys):
+    paths = cvat_frames(400)
+    splits = [split for split, _ in assign_splits(paths)]
+
+    # Neighbouring frames only change split at range boundaries
+    for i in range(1, len(paths)):
+        if i % 10:
+            assert splits[i] == splits[i - 1]
+    counts = Counter(splits)
+    assert counts['train'] and counts['val']
+    assert "Warning" not in capsys.readouterr().out
+
+def test_frame_ranges_split_a_single_clip(capsys):
+    paths = cvat_frames(40)
+    assert len({group_key(p) for p in paths}) == 4
+    splits = assign_splits(paths, group_frames=5)
+    assert {split for split, _ in splits} == {'train', 'val'}
+    assert "Warning" not in capsys.readouterr().out
+
+def test_empty_split_is_reported(capsys):
+    paths = cvat_frames(40)
+    splits = assign_splits(paths, group_by='sequence')
+
+    assert {split for split, _ in splits} == {'train'}
+    out = capsys.readouterr().out
+    assert "Warning: split 'val' got no images" in out